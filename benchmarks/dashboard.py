@@ -0,0 +1,134 @@
+"""Compares the default runtime against the opt-in uvloop + orjson runtime on the dashboard's response shapes.
+
+Usage (from the repository root, with fastapi and httpx installed, and optionally uvloop and orjson):
+
+    python benchmarks/dashboard.py [--requests 2000] [--tickets 50]
+
+A small FastAPI app mirroring `/api/guilds/{id}/config` and `/api/guilds/{id}/tickets` is built from the real
+response models in trident/server/models.py, and driven in-process over ASGI so that only the event loop and
+serialisation differ between runs (no network, Discord or database)."""
+
+import argparse
+import asyncio
+import datetime
+import importlib.util
+import pathlib
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse
+except ImportError:
+    ORJSONResponse = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Loaded by path, since importing the trident.server package also starts importing the whole server.
+_spec = importlib.util.spec_from_file_location(
+    "trident_server_models", pathlib.Path(__file__).parent.parent / "trident" / "server" / "models.py"
+)
+models = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(models)
+
+
+def make_guild_config(guild_id: int) -> "models.GuildConfig":
+    return models.GuildConfig(
+        entry_id=uuid.UUID(int=guild_id),
+        id=str(guild_id),
+        ticketCounter=1234,
+        ticketCategory=str(guild_id + 1),
+        logChannel=str(guild_id + 2),
+        supportRoles=[str(guild_id + 10 + i) for i in range(10)],
+        pingSupportRoles=True,
+        maxTickets=50,
+        supportEnabled=True,
+        questions=[
+            models.TicketQuestion(
+                label="Question %d" % i, placeholder="Placeholder", min_length=2, max_length=1024, required=True
+            )
+            for i in range(5)
+        ],
+    )
+
+
+def make_app(response_class, tickets: int) -> FastAPI:
+    app = FastAPI(default_response_class=response_class)
+    opened_at = datetime.datetime.now(datetime.timezone.utc)
+
+    @app.get("/api/guilds/{guild_id}/config", response_model=models.GuildConfig)
+    async def get_guild_config(guild_id: int):
+        return make_guild_config(guild_id)
+
+    @app.get("/api/guilds/{guild_id}/tickets", response_model=list[models.Ticket])
+    async def get_guild_tickets(guild_id: int):
+        guild = make_guild_config(guild_id)
+        return [
+            models.Ticket(
+                id=str(uuid.uuid4()),
+                localID=i,
+                guild=guild,
+                author=str(guild_id + 100 + i),
+                channel=str(guild_id + 1000 + i),
+                subject="Subject %d" % i,
+                openedAt=opened_at,
+                locked=bool(i % 2),
+            )
+            for i in range(tickets)
+        ]
+
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> dict[str, list[float]]:
+    timings = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for path in ("/api/guilds/1/config", "/api/guilds/1/tickets"):
+            await client.get(path)  # warm up
+            samples = timings[path] = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(path)
+                samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+    return timings
+
+
+def run_mode(name: str, response_class, use_uvloop: bool, requests: int, tickets: int) -> None:
+    app = make_app(response_class, tickets)
+    if use_uvloop:
+        timings = uvloop.run(drive(app, requests))
+    else:
+        timings = asyncio.run(drive(app, requests))
+    for path, samples in timings.items():
+        print(
+            "%-10s %-26s mean %7.3fms  p50 %7.3fms  p95 %7.3fms"
+            % (
+                name,
+                path,
+                statistics.fmean(samples) * 1000,
+                statistics.median(samples) * 1000,
+                statistics.quantiles(samples, n=20)[18] * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--tickets", type=int, default=50)
+    args = parser.parse_args()
+
+    run_mode("default", JSONResponse, False, args.requests, args.tickets)
+    if ORJSONResponse is None or uvloop is None:
+        print("uvloop and/or orjson are not installed; skipping the high-performance mode.")
+    else:
+        run_mode("fast", ORJSONResponse, True, args.requests, args.tickets)
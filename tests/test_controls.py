@@ -0,0 +1,51 @@
+"""Ticket controls must not leave a View in py-cord's view store for every ticket that is opened."""
+
+import asyncio
+
+import pytest
+
+discord = pytest.importorskip("discord")
+
+from trident.utils.controls import CLOSE, control_id, send_with_controls  # noqa: E402
+
+
+def message_payload(message_id: int, channel_id: int, components: list) -> dict:
+    return {
+        "id": message_id,
+        "channel_id": channel_id,
+        "author": {"id": 1, "username": "trident", "discriminator": "0", "avatar": None},
+        "content": "",
+        "timestamp": "2026-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "components": components,
+    }
+
+
+def test_sent_controls_are_not_kept():
+    async def test():
+        client = discord.Client(intents=discord.Intents.none())
+        state = client._connection
+        sent = iter(range(1000, 1006))
+
+        async def send_message(channel_id, content, **kwargs):
+            return message_payload(next(sent), channel_id, kwargs["components"])
+
+        state.http.send_message = send_message
+        for channel_id in range(100, 106):
+            message = await send_with_controls(client.get_partial_messageable(channel_id), "Ticket")
+            assert message.components[0].children[0].custom_id == control_id(CLOSE)
+
+        store = state._view_store
+        assert not store._synced_message_views
+        assert all(view.is_finished() for view, _ in store._views.values())
+        await client.close()
+
+    asyncio.run(test())
@@ -0,0 +1,64 @@
+"""With `[database] replicas` set, Tortoise has more than one connection, and transactions must name theirs."""
+
+import asyncio
+import datetime
+
+import pytest
+
+tortoise = pytest.importorskip("tortoise")
+
+from tortoise.exceptions import ParamsError  # noqa: E402
+from tortoise.transactions import in_transaction  # noqa: E402
+
+from trident.models import Guild, TicketDailyStats  # noqa: E402
+from trident.utils.replicas import ReplicaRouter, read_replica  # noqa: E402
+from trident.utils.rollups import record_opened  # noqa: E402
+
+
+async def init_with_replica() -> None:
+    ReplicaRouter.configure(["replica_0"])
+    await tortoise.Tortoise.init(
+        config={
+            "connections": {"default": "sqlite://:memory:", "replica_0": "sqlite://:memory:"},
+            "apps": {"models": {"models": ["trident.models"], "default_connection": "default"}},
+            "routers": [ReplicaRouter],
+        }
+    )
+    await tortoise.Tortoise.generate_schemas()
+
+
+def run(test):
+    async def wrapper():
+        await init_with_replica()
+        try:
+            await test()
+        finally:
+            await tortoise.Tortoise.close_connections()
+            ReplicaRouter.configure([])
+
+    asyncio.run(wrapper())
+
+
+def test_transaction_needs_connection_name():
+    async def test():
+        with pytest.raises(ParamsError):
+            async with in_transaction():
+                pass
+        async with in_transaction("default") as tx:
+            await Guild.create(id=1, using_db=tx)
+        assert await Guild.filter(id=1).exists()
+
+    run(test)
+
+
+def test_rollup_with_replica():
+    async def test():
+        guild = await Guild.create(id=2)
+        when = datetime.datetime.now(datetime.timezone.utc)
+        with read_replica():
+            await record_opened(guild, when)
+            await record_opened(guild, when)
+        row = await TicketDailyStats.get(guild=guild, day=when.date())
+        assert row.opened == 2
+
+    run(test)
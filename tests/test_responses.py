@@ -0,0 +1,64 @@
+"""ResponseTracker.flush must not roll up a first response twice when only some of its transactions commit."""
+
+import asyncio
+import datetime
+
+import pytest
+
+tortoise = pytest.importorskip("tortoise")
+
+from trident.models import Guild, TicketDailyStats  # noqa: E402
+from trident.utils.responses import ResponseTracker  # noqa: E402
+
+
+def test_failed_rollup_requeues_only_uncommitted_groups(monkeypatch):
+    async def test():
+        await tortoise.Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["trident.models"]})
+        await tortoise.Tortoise.generate_schemas()
+        try:
+            await Guild.create(id=1)
+            await Guild.create(id=2)
+            day = datetime.date(2026, 1, 1)
+            tracker = ResponseTracker()
+            tracker._first_responses = [(1, day, 30.0), (2, day, 60.0), (1, day, 90.0)]
+
+            save = TicketDailyStats.save
+
+            async def failing_save(self, *args, **kwargs):
+                if (await self.guild).id == 2:
+                    raise RuntimeError("connection lost")
+                await save(self, *args, **kwargs)
+
+            monkeypatch.setattr(TicketDailyStats, "save", failing_save)
+            with pytest.raises(RuntimeError):
+                await tracker.flush()
+            assert tracker._first_responses == [(2, day, 60.0)]
+
+            monkeypatch.setattr(TicketDailyStats, "save", save)
+            await tracker.flush()
+            assert tracker._first_responses == []
+            assert (await TicketDailyStats.get(guild__id=1, day=day)).responded == 2
+            assert (await TicketDailyStats.get(guild__id=2, day=day)).responded == 1
+        finally:
+            await tortoise.Tortoise.close_connections()
+
+    asyncio.run(test())
+
+
+def test_close_saves_pending_first_responses():
+    async def test():
+        await tortoise.Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["trident.models"]})
+        await tortoise.Tortoise.generate_schemas()
+        try:
+            await Guild.create(id=1)
+            day = datetime.date(2026, 1, 1)
+            tracker = ResponseTracker(flush_interval=3600)
+            tracker.start()
+            tracker._first_responses = [(1, day, 30.0)]
+            await tracker.close()
+            assert tracker._task is None
+            assert (await TicketDailyStats.get(guild__id=1, day=day)).responded == 1
+        finally:
+            await tortoise.Tortoise.close_connections()
+
+    asyncio.run(test())
@@ -1,3 +1,4 @@
+import textwrap
 from typing import Annotated
 
 import discord
@@ -5,10 +6,12 @@ from discord.ext import commands
 from tortoise.transactions import in_transaction
 
 from trident.models import Guild
+from trident.utils.replicas import read_replica
 from trident.utils.views import (
     ChannelSelectorCustomView,
     ConfirmCustomView,
     RoleSelectorCustomView, ServerConfigCustomView,
+    question_forms,
 )
 
 
@@ -16,6 +19,14 @@ class ConfigurationCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def invalidate_caches(self, guild_id: int) -> None:
+        """Drops anything other cogs have cached about a guild's configuration, after it has been changed."""
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            ticket_cog.support_cache.invalidate(guild_id)
+            ticket_cog.category_pools.invalidate(guild_id)
+        question_forms.invalidate(guild_id)
+
     config_group = discord.SlashCommandGroup(
         "settings",
         "Manage server settings.",
@@ -33,7 +44,7 @@ class ConfigurationCog(commands.Cog):
         if not view.chosen:
             return await ctx.edit(content="No category selected.", view=None)
 
-        async with in_transaction() as tx:
+        async with in_transaction("default") as tx:
             entry, is_new = await Guild.get_or_create(id=ctx.guild.id, using_db=tx)
             entry.ticket_category = view.chosen.id
 
@@ -61,6 +72,7 @@ class ConfigurationCog(commands.Cog):
             entry.ping_support_roles = view.chosen
             await ctx.edit(content="Saving...", view=None)
             await entry.save(tx)
+            self.invalidate_caches(ctx.guild.id)
             if is_new:
                 return await ctx.edit(content="Finished setting up your server!")
             else:
@@ -70,7 +82,8 @@ class ConfigurationCog(commands.Cog):
     async def view_config(self, ctx: discord.ApplicationContext):
         """Shows you your server's current settings."""
         await ctx.defer(ephemeral=True)
-        guild = await Guild.get_or_none(id=ctx.guild.id)
+        with read_replica():
+            guild = await Guild.get_or_none(id=ctx.guild.id)
         if not guild:
             return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
 
@@ -84,12 +97,33 @@ class ConfigurationCog(commands.Cog):
         embed.add_field(name="Total tickets:", value="{:,}".format(guild.ticket_count - 1))
         category_channel = ctx.guild.get_channel(guild.ticket_category)
         embed.add_field(name="Ticket category:", value=category_channel.mention if category_channel else "None")
+        overflow = list(filter(None, map(ctx.guild.get_channel, guild.overflow_categories)))
+        embed.add_field(
+            name="Overflow categories:",
+            value=textwrap.shorten(", ".join(c.mention for c in overflow), 1024, placeholder="...") or "None",
+        )
+        embed.add_field(name="Auto-create categories:", value="Yes" if guild.auto_create_categories else "No")
         log_channel = ctx.guild.get_channel(guild.log_channel)
         embed.add_field(name="Log channel:", value=log_channel.mention if log_channel else "None")
         embed.add_field(name="Support roles:", value=str(len(guild.support_roles)))
         embed.add_field(name="Ping support roles:", value="Yes" if guild.ping_support_roles else "No")
-        embed.add_field(name="Max open tickets:", value=str(guild.max_tickets))
+        embed.add_field(name="Max open tickets per category:", value=str(guild.max_tickets))
         embed.add_field(name="Ticket creation enabled:", value="Yes" if guild.support_enabled else "No")
+        embed.add_field(
+            name="Auto-close after:",
+            value="{:,} hours of inactivity".format(guild.auto_close_after) if guild.auto_close_after else "Never",
+        )
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            ticket_cog.admission.configure(guild.id, guild.ticket_rate_limit, guild.ticket_burst)
+            per_minute, burst = ticket_cog.admission.limits(guild.id)
+            level = ticket_cog.admission.bucket(guild.id).level
+            embed.add_field(
+                name="Ticket rate limit:",
+                value="{:g}/minute, bursts of {:,}\n({:.1f}/{:,} available now)".format(
+                    per_minute, burst, level, burst
+                ),
+            )
         embed.set_footer(text="Server ID: {}".format(guild.id))
         view = ServerConfigCustomView(ctx, guild, *guild.support_roles)
         await ctx.respond(embed=embed, view=view)
@@ -112,6 +146,11 @@ class ConfigurationCog(commands.Cog):
             return await ctx.edit(content="Cancelled.", view=None)
         else:
             await entry.delete()
+            self.invalidate_caches(ctx.guild.id)
+            ticket_cog = self.bot.get_cog("TicketCog")
+            if ticket_cog is not None:
+                ticket_cog.admission.configure(ctx.guild.id, None, None)
+                ticket_cog.waitlist.forget(ctx.guild.id)
             return await ctx.edit(content="Reset.", view=None)
 
     config_support_roles_group = config_group.create_subgroup(
@@ -133,6 +172,7 @@ class ConfigurationCog(commands.Cog):
             return await ctx.respond("You can only have up to 25 support roles.", ephemeral=True)
         guild.support_roles += [role.id]
         await guild.save()
+        self.invalidate_caches(ctx.guild.id)
         await ctx.respond("Added {} to the list of support roles.".format(role.mention), ephemeral=True)
 
     @config_support_roles_group.command(name="remove")
@@ -147,6 +187,7 @@ class ConfigurationCog(commands.Cog):
 
         guild.support_roles.remove(role.id)
         await guild.save()
+        self.invalidate_caches(ctx.guild.id)
         await ctx.respond("Removed {} from the list of support roles.".format(role.mention), ephemeral=True)
 
     @config_group.command(name="log-channel")
@@ -179,6 +220,71 @@ class ConfigurationCog(commands.Cog):
         await guild.save()
         await ctx.respond("Ticket category set to {}.".format(category.mention), ephemeral=True)
 
+    config_overflow_group = config_group.create_subgroup(
+        "overflow-categories",
+        "Manage the categories tickets are opened in once the ticket category is full.",
+    )
+
+    @config_overflow_group.command(name="add")
+    @discord.default_permissions(manage_channels=True)
+    async def add_overflow_category(self, ctx: discord.ApplicationContext, category: discord.CategoryChannel):
+        """Adds a category to open tickets in once the ones before it are full."""
+        guild = await Guild.get_or_none(id=ctx.guild.id)
+        if guild is None:
+            return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+
+        if category.id == guild.ticket_category or category.id in guild.overflow_categories:
+            return await ctx.respond("That category is already used for tickets.", ephemeral=True)
+        if not category.permissions_for(ctx.me).manage_channels:
+            return await ctx.respond("I cannot manage that category.", ephemeral=True)
+
+        guild.overflow_categories = [*guild.overflow_categories, category.id]
+        await guild.save()
+        await ctx.respond("Added {} as an overflow category.".format(category.mention), ephemeral=True)
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            await ticket_cog.advance_waitlist(ctx.guild)
+
+    @config_overflow_group.command(name="remove")
+    @discord.default_permissions(manage_channels=True)
+    async def remove_overflow_category(self, ctx: discord.ApplicationContext, category: discord.CategoryChannel):
+        """Stops opening new tickets in an overflow category. Tickets already in it are left alone."""
+        guild = await Guild.get_or_none(id=ctx.guild.id)
+        if guild is None:
+            return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+
+        if category.id not in guild.overflow_categories:
+            return await ctx.respond("That category is not an overflow category.", ephemeral=True)
+
+        guild.overflow_categories = [c for c in guild.overflow_categories if c != category.id]
+        await guild.save()
+        await ctx.respond("Removed {} from the overflow categories.".format(category.mention), ephemeral=True)
+
+    @config_group.command(name="auto-create-categories")
+    @discord.default_permissions(manage_channels=True)
+    async def set_auto_create_categories(
+        self,
+        ctx: discord.ApplicationContext,
+        enabled: discord.Option(
+            bool,
+            default=None,
+            description="If True, new overflow categories are made when all are full. Blank toggles current setting.",
+        ),
+    ):
+        """Enables or disables creating new overflow categories when every ticket category is full."""
+        guild = await Guild.get_or_none(id=ctx.guild.id)
+        if guild is None:
+            return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+
+        if enabled is None:
+            enabled = not guild.auto_create_categories
+
+        guild.auto_create_categories = enabled
+        await guild.save()
+        await ctx.respond(
+            "New ticket categories will {}be created automatically.".format("" if enabled else "not "), ephemeral=True
+        )
+
     @config_group.command(name="max-tickets")
     @discord.default_permissions(manage_channels=True)
     async def set_max_tickets(
@@ -188,14 +294,14 @@ class ConfigurationCog(commands.Cog):
             int,
             discord.Option(
                 int,
-                description="The maximum number of tickets that can be open at once.",
+                description="The maximum number of tickets that can be open at once in each ticket category.",
                 min_value=1,
                 max_value=50,
                 default=50,
             ),
         ],
     ):
-        """Sets the maximum number of tickets that can be open at once."""
+        """Sets the maximum number of tickets that can be open at once in each ticket category."""
         guild = await Guild.get_or_none(id=ctx.guild.id)
         if guild is None:
             return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
@@ -203,6 +309,77 @@ class ConfigurationCog(commands.Cog):
         guild.max_tickets = max_tickets
         await guild.save()
         await ctx.respond("Max tickets set to {}.".format(max_tickets), ephemeral=True)
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            await ticket_cog.advance_waitlist(ctx.guild)
+
+    @config_group.command(name="ticket-rate-limit")
+    @discord.default_permissions(manage_channels=True)
+    async def set_ticket_rate_limit(
+        self,
+        ctx: discord.ApplicationContext,
+        per_minute: discord.Option(
+            float,
+            description="How many new tickets can be opened per minute. Blank uses the default.",
+            min_value=0.1,
+            max_value=600,
+            default=None,
+        ),
+        burst: discord.Option(
+            int,
+            description="How many new tickets can be opened at once. Blank uses the default.",
+            min_value=1,
+            max_value=100,
+            default=None,
+        ),
+    ):
+        """Limits how quickly new tickets can be opened."""
+        guild = await Guild.get_or_none(id=ctx.guild.id)
+        if guild is None:
+            return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+
+        guild.ticket_rate_limit = per_minute
+        guild.ticket_burst = burst
+        await guild.save()
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is None:
+            return await ctx.respond("Ticket rate limit updated.", ephemeral=True)
+        ticket_cog.admission.configure(guild.id, per_minute, burst)
+        per_minute, burst = ticket_cog.admission.limits(guild.id)
+        await ctx.respond(
+            "New tickets are now limited to {:g} per minute, in bursts of up to {:,}.".format(per_minute, burst),
+            ephemeral=True,
+        )
+
+    @config_group.command(name="auto-close")
+    @discord.default_permissions(manage_channels=True)
+    async def set_auto_close(
+        self,
+        ctx: discord.ApplicationContext,
+        hours: discord.Option(
+            int,
+            description="Close tickets after this many hours without a message. Blank never closes them.",
+            min_value=1,
+            max_value=24 * 90,
+            default=None,
+        ),
+    ):
+        """Closes tickets automatically once they have been inactive for a while."""
+        guild = await Guild.get_or_none(id=ctx.guild.id)
+        if guild is None:
+            return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+
+        guild.auto_close_after = hours
+        await guild.save()
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None and ticket_cog.inactivity_enabled:
+            await ticket_cog.track_inactivity([guild.id])
+        if hours:
+            await ctx.respond(
+                "Tickets will now be closed after {:,} hours without a message.".format(hours), ephemeral=True
+            )
+        else:
+            await ctx.respond("Tickets will no longer be closed automatically.", ephemeral=True)
 
     @config_group.command(name="allow-new-tickets")
     @discord.default_permissions(manage_channels=True)
@@ -226,6 +403,10 @@ class ConfigurationCog(commands.Cog):
         guild.support_enabled = enabled
         await guild.save()
         await ctx.respond("Ticket creation is now {}.".format("enabled" if enabled else "disabled"), ephemeral=True)
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            # Cancels the waitlist, if ticket creation was disabled.
+            await ticket_cog.advance_waitlist(ctx.guild)
 
 
 def setup(bot):
@@ -7,16 +7,71 @@ import discord
 import humanize
 from discord.ext import commands
 
-from trident.models import Guild
+from trident.utils.pool import get_pool_stats
+from trident.utils.stats import StatsSampler, psutil
+
+OWNER_ID = 421698654189912064
 
 
 def percent(part: float, whole: float, decimals: int = 1) -> str:
+    if not whole:
+        return "0%"
     return "%s%%" % round(part / whole * 100, decimals)
 
 
+def describe_trend(trend: tuple[float, float, float, float] | None, fmt) -> str:
+    if trend is None:
+        return "No data"
+    first, last, low, high = trend
+    arrow = (
+        "\N{NORTH EAST ARROW}" if last > first else "\N{SOUTH EAST ARROW}" if last < first else "\N{RIGHTWARDS ARROW}"
+    )
+    return f"{fmt(last)} {arrow} (min {fmt(low)}, max {fmt(high)})"
+
+
 class GeneralCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.sampler = StatsSampler(bot)
+        if bot.is_ready():
+            self.sampler.recount_channels()
+            self.sampler.start()
+
+    def cog_unload(self):
+        self.sampler.stop()
+
+    async def get_owner(self) -> discord.User | None:
+        return await self.bot.resolver.user(OWNER_ID)
+
+    async def get_snapshot(self):
+        return self.sampler.latest or await self.sampler.sample()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.sampler.recount_channels()
+        self.sampler.start()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.sampler.add_channels(guild.channels)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.sampler.remove_channels(guild.channels)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.sampler.add_channels((channel,))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.sampler.remove_channels((channel,))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.type != after.type:
+            self.sampler.remove_channels((before,))
+            self.sampler.add_channels((after,))
 
     @commands.slash_command(
         contexts={
@@ -62,32 +117,14 @@ class GeneralCog(commands.Cog):
         # )
         # version = version.stdout.strip()
         system_started = discord.utils.utcnow() - timedelta(seconds=time.monotonic())
-        owner = await self.bot.get_or_fetch_user(421698654189912064)
-
-        total_users = len(self.bot.users)
-        all_channels = list(self.bot.get_all_channels())
-        all_text_channels = list(filter(lambda channel: channel.type == discord.ChannelType.text, all_channels))
-        all_voice_channels = list(filter(lambda channel: channel.type == discord.ChannelType.voice, all_channels))
-        all_stage_channels = list(filter(lambda channel: channel.type == discord.ChannelType.stage_voice, all_channels))
-        ram_used = 0.0
-        cpu_percent = 0.0
-        disk_usage = (0.0, 1.0)
-        proc_id = 0
-        guilds_set_up = await Guild.filter().count()
-
-        # system-stat related stuff will be done only if psutil is installed
-        try:
-            import psutil
-        except ImportError:
-            psutil = None
-        else:
-            process = psutil.Process()
-            with process.oneshot():
-                cpu_percent = await self.bot.loop.run_in_executor(None, process.cpu_percent, 1)
-                _mem_info = await self.bot.loop.run_in_executor(None, process.memory_full_info)
-                ram_used = _mem_info.uss
-                proc_id = process.pid
-            disk_usage = psutil.disk_usage(__file__)
+        owner = await self.get_owner()
+        snapshot = await self.get_snapshot()
+
+        channels = snapshot.channels
+        total_channels = sum(channels.values())
+        text_channels = channels.get(discord.ChannelType.text, 0)
+        voice_channels = channels.get(discord.ChannelType.voice, 0)
+        stage_channels = channels.get(discord.ChannelType.stage_voice, 0)
 
         embed = discord.Embed(
             title="About Me",
@@ -98,29 +135,38 @@ class GeneralCog(commands.Cog):
             f"amazingly fast, and super reliable.",
             colour=ctx.me.colour,
         )
-        embed.set_author(name=str(owner), icon_url=owner.display_avatar.url)
+        if owner is not None:
+            embed.set_author(name=str(owner), icon_url=owner.display_avatar.url)
 
         if psutil:
-            disk_used_nice = humanize.naturalsize(disk_usage.used, binary=True)
-            disk_total_nice = humanize.naturalsize(disk_usage.total, binary=True)
+            disk_used_nice = humanize.naturalsize(snapshot.disk_used, binary=True)
+            disk_total_nice = humanize.naturalsize(snapshot.disk_total, binary=True)
             embed.add_field(
                 name="System Stats",
-                value=f"CPU Usage: {cpu_percent}%\n"
-                f"RAM Usage: {humanize.naturalsize(ram_used, binary=True)}\n"
+                value=f"CPU Usage: {snapshot.cpu_percent}%\n"
+                f"RAM Usage: {humanize.naturalsize(snapshot.rss, binary=True)}\n"
                 f"Disk Usage: {disk_used_nice}/{disk_total_nice}\n"
-                f"Process ID: {proc_id}",
+                f"Process ID: {self.sampler.process.pid}",
             )
         embed.add_field(
             name="Channels",
-            value=f"Total: {len(all_channels):,}\n"
-            f"Total text channels: {len(all_text_channels):,} ({percent(len(all_text_channels), len(all_channels))})\n"
-            f"Total voice channels: {len(all_voice_channels):,} "
-            f"({percent(len(all_voice_channels), len(all_channels))})\n"
-            f"Total stage channels: {len(all_stage_channels):,} "
-            f"({percent(len(all_stage_channels), len(all_channels))})",
+            value=f"Total: {total_channels:,}\n"
+            f"Total text channels: {text_channels:,} ({percent(text_channels, total_channels)})\n"
+            f"Total voice channels: {voice_channels:,} ({percent(voice_channels, total_channels)})\n"
+            f"Total stage channels: {stage_channels:,} ({percent(stage_channels, total_channels)})",
+        )
+        embed.add_field(name="Users (cached)", value=f"Total: {snapshot.users:,}")
+        embed.add_field(name="Guilds", value=f"Total: {snapshot.guilds:,} ({snapshot.guilds_set_up} database entries)")
+        shard_id = ctx.guild.shard_id if ctx.guild else 0
+        shard = self.bot.get_shard(shard_id)
+        embed.add_field(
+            name="Shards",
+            value=f"Total: {self.bot.shard_count or 1:,}\n"
+            f"This cluster: {len(self.bot.shards):,}"
+            + (f" (cluster {self.bot.cluster_id})" if self.bot.cluster_id is not None else "")
+            + f"\nThis shard: {shard_id}"
+            + (f" ({round(shard.latency * 1000)}ms)" if shard else ""),
         )
-        embed.add_field(name="Users (cached)", value=f"Total: {total_users:,}")
-        embed.add_field(name="Guilds", value=f"Total: {len(self.bot.guilds):,} ({guilds_set_up} database entries)")
         embed.add_field(
             name="Uptime",
             value=f"Bot started: {discord.utils.format_dt(self.bot.started_at, 'R')}\n"
@@ -128,9 +174,71 @@ class GeneralCog(commands.Cog):
             f"Bot last websocket reconnect: {discord.utils.format_dt(self.bot.last_reconnect, 'R')}\n"
             f"System started: {discord.utils.format_dt(system_started, 'R')}\n",
         )
+        embed.set_footer(text="Stats as of")
+        embed.timestamp = snapshot.taken_at
         # embed.set_footer(text="Trident v{}".format(version))
         return await ctx.respond(embed=embed)
 
+    @commands.slash_command(name="stats")
+    @commands.is_owner()
+    async def stats(self, ctx: discord.ApplicationContext):
+        """Shows recent resource usage trends. Owner only."""
+        snapshot = await self.get_snapshot()
+        window = len(self.sampler.samples)
+        embed = discord.Embed(
+            title="Stats",
+            description=f"Trends over the last {window:,} samples "
+            f"({humanize.naturaldelta(timedelta(seconds=window * self.sampler.interval))}).",
+            colour=discord.Colour.blurple(),
+            timestamp=snapshot.taken_at,
+        )
+        embed.add_field(
+            name="CPU", value=describe_trend(self.sampler.trend("cpu_percent"), lambda x: f"{x:.1f}%"), inline=False
+        )
+        embed.add_field(
+            name="RSS",
+            value=describe_trend(self.sampler.trend("rss"), lambda x: humanize.naturalsize(x, binary=True)),
+            inline=False,
+        )
+        embed.add_field(
+            name="Event loop lag",
+            value=describe_trend(self.sampler.trend("loop_lag"), lambda x: f"{x * 1000:.1f}ms"),
+            inline=False,
+        )
+        embed.add_field(name="Guilds", value=describe_trend(self.sampler.trend("guilds"), "{:,}".format))
+        embed.add_field(name="Users (cached)", value=describe_trend(self.sampler.trend("users"), "{:,}".format))
+        monitor = self.bot.loop_monitor
+        if monitor is not None and (cuts := monitor.percentiles()) is not None:
+            embed.add_field(
+                name="Event loop lag percentiles",
+                value=f"p50: {cuts['p50'] * 1000:.1f}ms\n"
+                f"p95: {cuts['p95'] * 1000:.1f}ms\n"
+                f"p99: {cuts['p99'] * 1000:.1f}ms\n"
+                f"Max: {cuts['max'] * 1000:.1f}ms\n"
+                f"Recent stalls: {len(monitor.slow_callbacks):,}",
+            )
+        pool = get_pool_stats()
+        if pool is not None:
+            cuts = pool.latency_percentiles()
+            embed.add_field(
+                name="Database pool",
+                value=f"In use: {pool.in_use}/{pool.size}\n"
+                f"Waiting: {pool.waiting}\n"
+                f"Acquire timeouts: {pool.timeouts:,}\n"
+                + (
+                    f"Acquire p50/p95: {cuts['p50'] * 1000:.1f}ms/{cuts['p95'] * 1000:.1f}ms"
+                    if cuts
+                    else "Acquire latency: No data"
+                ),
+            )
+        ticket_cog = self.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            embed.add_field(
+                name="Channel renames",
+                value=f"Queued: {ticket_cog.renames.queue_depth:,}\nSuperseded: {ticket_cog.renames.superseded:,}",
+            )
+        await ctx.respond(embed=embed, ephemeral=True)
+
 
 def setup(bot):
     bot.add_cog(GeneralCog(bot))
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import textwrap
 from typing import Annotated
@@ -7,22 +8,54 @@ from discord.ext import commands, pages
 from discord.ui import Modal
 
 from trident.models import Guild, Tag
+from trident.utils.autocomplete import CompletionCache
+from trident.utils.replicas import read_replica
+from trident.utils.snapshots import TagSnapshot
+from trident.utils.trigram import TrigramIndex
 from trident.utils.views import ConfirmCustomView
 
+# Shared with tag_autocomplete_internal, which as a staticmethod has no cog to hang it off.
+tag_completions = CompletionCache()
+
 
 class TagsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.tag_indexes: dict[int, TrigramIndex] = {}
+
+    async def get_tag_index(self, guild_id: int) -> TrigramIndex:
+        """Fetches (building on first use) the trigram index of tag names for a guild."""
+        index = self.tag_indexes.get(guild_id)
+        if index is None:
+            names = await Tag.filter(guild__id=guild_id).values_list("name", flat=True)
+            index = self.tag_indexes[guild_id] = TrigramIndex(names)
+        return index
+
+    async def tag_not_found(self, ctx: discord.ApplicationContext, name: str):
+        """Responds to a missed tag lookup, suggesting the closest tag names if there are any."""
+        index = await self.get_tag_index(ctx.guild.id)
+        suggestions = index.search(name.lower().strip())
+        if not suggestions:
+            return await ctx.respond("Tag not found.")
+        return await ctx.respond(
+            "Tag not found. Did you mean: {}?".format(
+                ", ".join("`{}`".format(x.replace("`", "\\`")) for x in suggestions)
+            ),
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
 
     @staticmethod
     async def tag_autocomplete_internal(ctx: discord.AutocompleteContext):
         assert ctx.interaction.guild is not None
-        all_tags = (
-            await Tag.filter(guild__id=ctx.interaction.guild.id, name__icontains=ctx.options["tag"].lower())
-            .limit(25)
-            .all()
-        )
-        return [tag.name.lower().strip() for tag in all_tags]
+        guild_id = ctx.interaction.guild.id
+        query = (ctx.options["tag"] or "").lower()
+
+        async def fetch():
+            with read_replica():
+                all_tags = await Tag.filter(guild__id=guild_id, name__icontains=query).limit(25).all()
+            return [tag.name.lower().strip() for tag in all_tags]
+
+        return await tag_completions.get(guild_id, query, fetch)
 
     tag_autocomplete = discord.utils.basic_autocomplete(tag_autocomplete_internal)
 
@@ -36,14 +69,16 @@ class TagsCog(commands.Cog):
         self, ctx: discord.ApplicationContext, tag: Annotated[str, discord.Option(str, autocomplete=tag_autocomplete)]
     ):
         """View a tag"""
-        tag = await Tag.get_or_none(name=tag.lower().strip(), guild__id=ctx.guild.id)
+        name = tag
+        tag = await Tag.get_or_none(name=name.lower().strip(), guild__id=ctx.guild.id)
         if not tag:
-            return await ctx.respond("Tag not found.")
+            return await self.tag_not_found(ctx, name)
 
         if len(tag.content) > 2000:
-            user = await self.bot.get_or_fetch_user(tag.author)
+            user = await self.bot.resolver.user(tag.author)
             embed = discord.Embed(description=tag.content, colour=ctx.author.colour)
-            embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+            if user is not None:
+                embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
             content = None
         else:
             embed = None
@@ -61,6 +96,7 @@ class TagsCog(commands.Cog):
         guild = await Guild.get_or_none(id=ctx.guild.id)
         if guild is None:
             return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+        index = await self.get_tag_index(ctx.guild.id)
 
         class InputModal(Modal):
             def __init__(self):
@@ -97,6 +133,8 @@ class TagsCog(commands.Cog):
                     author=ctx.author.id,
                     owner=ctx.author.id,
                 )
+                index.add(tag_name)
+                tag_completions.invalidate(ctx.guild.id)
                 await interaction.followup.send(
                     "Successfully created a tag with the name `{}`!.".format(tag_name.replace("`", "\\`")),
                     ephemeral=True,
@@ -109,10 +147,12 @@ class TagsCog(commands.Cog):
         """Shows a list of every tag"""
         await ctx.defer(ephemeral=True)
         _pages = []
-        if search is None:
-            all_tags = await Tag.filter(guild__id=ctx.guild.id).order_by("-uses").all()
-        else:
-            all_tags = await Tag.filter(guild__id=ctx.guild.id, name__icontains=search).order_by("-uses").all()
+        with read_replica():
+            if search is None:
+                query = Tag.filter(guild__id=ctx.guild.id)
+            else:
+                query = Tag.filter(guild__id=ctx.guild.id, name__icontains=search)
+            all_tags = await TagSnapshot.fetch(query.order_by("-uses"))
         for page_number, tag_chunk in enumerate(discord.utils.as_chunks(iter(all_tags), 10), start=1):
             page = discord.Embed(
                 title="Tags, page {:,}".format(page_number), description="", color=discord.Color.blurple()
@@ -136,9 +176,10 @@ class TagsCog(commands.Cog):
         self, ctx: discord.ApplicationContext, tag: Annotated[str, discord.Option(str, autocomplete=tag_autocomplete)]
     ):
         """Deletes a tag"""
-        tag = await Tag.get_or_none(name=tag.lower().strip(), guild__id=ctx.guild.id)
+        name = tag
+        tag = await Tag.get_or_none(name=name.lower().strip(), guild__id=ctx.guild.id)
         if not tag:
-            return await ctx.respond("Tag not found.")
+            return await self.tag_not_found(ctx, name)
 
         if not ctx.author.guild_permissions.administrator:
             if tag.owner != ctx.author.id:
@@ -152,6 +193,9 @@ class TagsCog(commands.Cog):
             return await ctx.edit(content="Tag was not deleted.", view=None)
         else:
             await tag.delete()
+            if ctx.guild.id in self.tag_indexes:
+                self.tag_indexes[ctx.guild.id].remove(tag.name)
+            tag_completions.invalidate(ctx.guild.id)
             return await ctx.edit(content="Tag was successfully deleted.", view=None)
 
     @tag_group.command(name="edit")
@@ -159,13 +203,15 @@ class TagsCog(commands.Cog):
         self, ctx: discord.ApplicationContext, tag: Annotated[str, discord.Option(str, autocomplete=tag_autocomplete)]
     ):
         """Edits a tag. You must be an administrator or own the tag."""
-        tag = await Tag.get_or_none(name=tag.lower().strip(), guild__id=ctx.guild.id)
+        name = tag
+        tag = await Tag.get_or_none(name=name.lower().strip(), guild__id=ctx.guild.id)
         if not tag:
-            return await ctx.respond("Tag not found.")
+            return await self.tag_not_found(ctx, name)
 
         if not ctx.author.guild_permissions.administrator:
             if tag.owner != ctx.author.id:
                 return await ctx.respond("You do not have permission to edit this tag.", ephemeral=True)
+        index = await self.get_tag_index(ctx.guild.id)
 
         class InputModal(Modal):
             def __init__(self):
@@ -209,7 +255,11 @@ class TagsCog(commands.Cog):
                     return await interaction.response.send_message("No changes were made.", ephemeral=True)
 
                 await interaction.response.defer(ephemeral=True)
+                old_name = tag.name
                 await tag.update_from_dict(kwargs)
+                if "name" in kwargs:
+                    index.rename(old_name, kwargs["name"])
+                    tag_completions.invalidate(ctx.guild.id)
                 await interaction.followup.send(
                     f"Successfully edited tag {tag.name!r}.",
                     ephemeral=True,
@@ -226,9 +276,10 @@ class TagsCog(commands.Cog):
         to: discord.Member,
     ):
         """Transfers ownership of a tag to someone else."""
-        tag = await Tag.get_or_none(name=tag.lower().strip(), guild__id=ctx.guild.id)
+        name = tag
+        tag = await Tag.get_or_none(name=name.lower().strip(), guild__id=ctx.guild.id)
         if not tag:
-            return await ctx.respond("Tag not found.")
+            return await self.tag_not_found(ctx, name)
 
         if not ctx.author.guild_permissions.administrator:
             if tag.owner != ctx.author.id:
@@ -263,18 +314,16 @@ class TagsCog(commands.Cog):
                 await interaction.edit_original_message(view=self)
                 await interaction.response.send_message("\N{WHITE HEAVY CHECK MARK} You now own this ticket!")
 
-        tag = await Tag.get_or_none(name=tag.lower().strip(), guild__id=ctx.guild.id)
+        name = tag
+        with read_replica():
+            tag = await Tag.get_or_none(name=name.lower().strip(), guild__id=ctx.guild.id)
         if not tag:
-            return await ctx.respond("Tag not found.")
+            return await self.tag_not_found(ctx, name)
 
         created_at = tag.created_at
-        author = await self.bot.get_or_fetch_user(tag.author)
-        owner = await self.bot.get_or_fetch_user(tag.owner)
-        try:
-            await ctx.guild.fetch_member(tag.owner)
-            in_guild = True
-        except discord.HTTPException:
-            in_guild = False
+        (author, owner), in_guild = await asyncio.gather(
+            self.bot.resolver.users(tag.author, tag.owner), self.bot.resolver.is_member(ctx.guild, tag.owner)
+        )
 
         embed = discord.Embed(
             title=f"{tag.name!r}:",
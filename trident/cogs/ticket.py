@@ -1,13 +1,41 @@
 import asyncio
+import datetime
+import logging
+import re
 import textwrap
 from typing import Optional
 
 import discord
+import humanize
 from discord.ext import commands
+from tortoise.expressions import Q
 from tortoise.transactions import in_transaction
 
 from trident.models import Guild, Ticket
-from trident.utils.views import QuestionsModal
+from trident.utils.categories import CategoryPoolCache
+from trident.utils.controls import (
+    ADD_MEMBER,
+    CLOSE,
+    LOCK,
+    AddMemberModal,
+    modal_values,
+    parse_control_id,
+    parse_questions_id,
+    questions_id,
+    send_with_controls,
+)
+from trident.utils.inactivity import InactivityTracker, TicketTimer
+from trident.utils.ratelimit import TicketAdmission
+from trident.utils.renames import ChannelRenameScheduler
+from trident.utils.replicas import read_replica
+from trident.utils.responses import ResponseTracker
+from trident.utils.rollups import record_closed, record_opened, summarise
+from trident.utils.snapshots import GuildSnapshot
+from trident.utils.support import SupportRoleCache, member_role_ids
+from trident.utils.views import ConfirmCustomView, TicketQuestionsModal, question_forms
+from trident.utils.waitlist import TicketWaitlist
+
+log = logging.getLogger("trident.tickets")
 
 yes = discord.PermissionOverwrite(
     read_messages=True,
@@ -20,13 +48,143 @@ yes = discord.PermissionOverwrite(
     use_slash_commands=True,
 )
 no = discord.PermissionOverwrite.from_pair(discord.Permissions.none(), discord.Permissions.all())
+MENTION_RE = re.compile(r"<@(!|&)?(\d+)>|(\d{15,20})")
+# Strong references to tasks nothing else holds on to, so they are not garbage collected before they finish.
+_background_tasks: set[asyncio.Task] = set()
 
 
 class TicketCog(commands.Cog):
+    support_cache = SupportRoleCache(yes, no)
+    category_pools = CategoryPoolCache()
+
     def __init__(self, bot):
         self.bot = bot
+        self.renames = ChannelRenameScheduler()
+        self.admission = TicketAdmission(bot.config["trident"]["ticket_rate_limit"])
+        self.admission_loaded = False
+        self.waitlist = TicketWaitlist()
+        self.waitlist_loaded = False
+        self.category_locks: dict[int, asyncio.Lock] = {}
+        # Channel IDs of tickets being closed or (un)locked, by command or button.
+        self.closing: set[int] = set()
+        self.locking: set[int] = set()
+        # (guild ID, user ID) of tickets being created from a submitted questions form.
+        self.creating: set[tuple[int, int]] = set()
+        inactivity_config = bot.config["trident"]["inactivity"]
+        self.inactivity = InactivityTracker(
+            self.warn_inactive,
+            self.close_inactive,
+            tick=inactivity_config.get("tick", 30),
+            flush_interval=inactivity_config.get("flush_interval", 30),
+        )
+        # Without message events, every ticket would look inactive.
+        self.inactivity_enabled = bot.intents.guild_messages
+        self.inactivity_loaded = False
+        self.responses = ResponseTracker(flush_interval=bot.config["trident"]["responses"].get("flush_interval", 30))
+        # Likewise, without message events no ticket would ever get a response.
+        self.responses_enabled = bot.intents.guild_messages
+        self.responses_loaded = False
+
+    def cog_unload(self):
+        self.renames.close()
+        # cog_unload can't be a coroutine, so this runs in the background. On shutdown, the bot awaits it instead.
+        task = asyncio.create_task(self.save_tracked())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def save_tracked(self) -> None:
+        """Stops the inactivity and response trackers, writing out whatever they have not yet saved."""
+        for tracker in (self.inactivity, self.responses):
+            try:
+                await tracker.close()
+            except Exception as e:
+                log.error("Failed to save tracked ticket state: %s", e, exc_info=e)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.admission_loaded:
+            self.admission_loaded = True
+            count = await self.load_rate_limits(guild.id for guild in self.bot.guilds)
+            log.info("Loaded %d per-guild ticket rate limits.", count)
+        if not self.waitlist_loaded:
+            self.waitlist_loaded = True
+            count = await self.waitlist.load(guild.id for guild in self.bot.guilds)
+            log.info("Loaded %d waitlisted ticket requests.", count)
+            for guild in self.bot.guilds:
+                await self.advance_waitlist(guild)
+        if not self.inactivity_loaded:
+            self.inactivity_loaded = True
+            if self.inactivity_enabled:
+                count = await self.track_inactivity(guild.id for guild in self.bot.guilds)
+                log.info("Tracking inactivity in %d tickets.", count)
+                self.inactivity.start()
+            else:
+                log.warning("The guild_messages intent is disabled, so tickets will not be closed for inactivity.")
+        if not self.responses_loaded:
+            self.responses_loaded = True
+            if self.responses_enabled:
+                tickets = await Ticket.filter(guild__id__in=[guild.id for guild in self.bot.guilds]).select_related(
+                    "guild"
+                )
+                for ticket in tickets:
+                    self.responses.track(ticket, ticket.guild.id)
+                log.info("Tracking support responses in %d tickets.", len(tickets))
+                self.responses.start()
+            else:
+                log.warning("The guild_messages intent is disabled, so support response times will not be tracked.")
 
-    def log_channel(self, config) -> Optional[discord.TextChannel]:
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or message.guild is None:
+            return
+        if message.channel.id in self.inactivity:
+            self.inactivity.touch(message.channel.id, message.created_at)
+        state = self.responses.get(message.channel.id)
+        if state is not None and message.author.id != state.author_id:
+            support_roles = await self.support_role_ids(message.guild.id)
+            if not support_roles.isdisjoint(member_role_ids(message.author)):
+                self.responses.record_reply(state, message.created_at)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        if pool := self.category_pools.cached(channel.guild.id):
+            pool.add_channel(channel.category_id, channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.category_id != after.category_id and (pool := self.category_pools.cached(after.guild.id)):
+            pool.remove_channel(before.category_id, before.id)
+            pool.add_channel(after.category_id, after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.renames.cancel(channel.id)
+        self.inactivity.untrack(channel.id)
+        self.responses.untrack(channel.id)
+        if pool := self.category_pools.cached(channel.guild.id):
+            pool.remove_channel(channel.category_id, channel.id)
+            pool.remove_category(channel.id)
+        await self.advance_waitlist(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if self.waitlist.position(member.guild.id, member.id) is not None:
+            await self.waitlist.remove(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.support_cache.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, _, after: discord.Role):
+        self.support_cache.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.support_cache.invalidate(guild.id)
+        self.category_pools.invalidate(guild.id)
+
+    def log_channel(self, config: Guild | GuildSnapshot) -> Optional[discord.TextChannel]:
         if not config.log_channel:
             return
         channel = self.bot.get_channel(config.log_channel)
@@ -61,10 +219,214 @@ class TicketCog(commands.Cog):
             return False
 
     @staticmethod
-    def is_support(config: Guild, member: discord.Member) -> bool:
-        support_role_ids = config.support_roles
-        our_roles = [x.id for x in member.roles]
-        return any(x in our_roles for x in support_role_ids)
+    def resolve_targets(guild: discord.Guild, text: str) -> list[discord.Member | discord.Role]:
+        """Resolves every member/role mention (or raw ID) in `text` from the cache, ignoring anything unknown."""
+        targets = {}
+        for match in MENTION_RE.finditer(text):
+            kind, mention_id, raw_id = match.groups()
+            target_id = int(mention_id or raw_id)
+            if kind == "&":
+                target = guild.get_role(target_id)
+            elif kind is None and raw_id:
+                target = guild.get_member(target_id) or guild.get_role(target_id)
+            else:
+                target = guild.get_member(target_id)
+            if target is not None:
+                targets[target.id] = target
+        return list(targets.values())
+
+    @staticmethod
+    async def apply_overwrites(
+        channel: discord.TextChannel, changes: dict[discord.Member | discord.Role, discord.PermissionOverwrite], reason
+    ) -> None:
+        """Merges `changes` into the channel's existing overwrites and applies them in a single edit."""
+        overwrites = channel.overwrites
+        overwrites.update(changes)
+        await channel.edit(overwrites=overwrites, reason=reason)
+
+    async def load_rate_limits(self, guild_ids) -> int:
+        """Loads the ticket rate limits of every guild (out of those given) that has its own."""
+        rows = await Guild.filter(
+            Q(ticket_rate_limit__isnull=False) | Q(ticket_burst__isnull=False), id__in=list(guild_ids)
+        ).values_list("id", "ticket_rate_limit", "ticket_burst")
+        for guild_id, per_minute, burst in rows:
+            self.admission.configure(guild_id, per_minute, burst)
+        return len(rows)
+
+    async def support_role_ids(self, guild_id: int) -> frozenset[int]:
+        """Returns a guild's support role IDs, only querying for its config if they aren't already cached."""
+        role_ids = self.support_cache.cached_role_ids(guild_id)
+        if role_ids is None:
+            config = await Guild.get_or_none(id=guild_id)
+            role_ids = self.support_cache.role_ids(config) if config is not None else frozenset()
+        return role_ids
+
+    @staticmethod
+    def is_support(config: Guild | GuildSnapshot, member: discord.Member) -> bool:
+        return not TicketCog.support_cache.role_ids(config).isdisjoint(member_role_ids(member))
+
+    async def pick_category(self, guild: discord.Guild, config: Guild) -> Optional[discord.CategoryChannel]:
+        """Picks the least-loaded category in the guild's pool to open a ticket in, creating a new overflow category if
+        they are all full and the guild allows it. Returns None if the ticket can't be opened right now.
+
+        max_tickets applies to each category, so every overflow category adds that much capacity."""
+        pool = self.category_pools.get(guild, config)
+        category_id = pool.least_loaded(config.max_tickets)
+        if category_id is None and config.auto_create_categories:
+            async with self.category_locks.setdefault(guild.id, asyncio.Lock()):
+                # Someone else may have made one while we were waiting.
+                category_id = pool.least_loaded(config.max_tickets)
+                if category_id is None:
+                    return await self.create_overflow_category(guild, config)
+        return guild.get_channel(category_id) if category_id is not None else None
+
+    async def create_overflow_category(self, guild: discord.Guild, config: Guild) -> Optional[discord.CategoryChannel]:
+        pool = self.category_pools.get(guild, config)
+        primary = guild.get_channel(config.ticket_category)
+        try:
+            category = await guild.create_category(
+                "{} {:,}".format(primary.name if primary else "Tickets", len(pool) + 1),
+                overwrites=primary.overwrites if primary else {guild.default_role: no, guild.me: yes},
+                reason="All ticket categories are full.",
+            )
+        except discord.HTTPException as e:
+            log.error("Failed to create an overflow ticket category in %s: %s", guild.id, e)
+            return None
+        config.overflow_categories = [*config.overflow_categories, category.id]
+        await config.save(update_fields=["overflow_categories"])
+        pool.source = self.category_pools.category_ids(config)
+        pool.add_category(category)
+        return category
+
+    async def open_ticket(
+        self, config: Guild, category: discord.CategoryChannel, member: discord.Member, answers: dict[str, str]
+    ) -> tuple[Ticket, discord.TextChannel]:
+        """Creates a ticket channel for `member`, with their answers (by question label) to the server's questions."""
+        async with in_transaction("default") as tx:
+            template = self.support_cache.get(member.guild, config)
+            support_roles = template.roles
+            overwrites = {**template.overwrites, member: yes}
+            channel: discord.TextChannel = await category.create_text_channel(
+                f"ticket-{config.ticket_count}",
+                overwrites=overwrites,
+                position=0,
+                reason=f"Ticket created by {member.name}.",
+            )
+            # Count it straight away, rather than once the gateway tells us about it.
+            if pool := self.category_pools.cached(member.guild.id):
+                pool.add_channel(category.id, channel.id)
+            try:
+                ticket = await Ticket.create(
+                    number=config.ticket_count,
+                    guild=config,
+                    channel=channel.id,
+                    author=member.id,
+                    opened_at=discord.utils.utcnow(),
+                    using_db=tx,
+                )
+            except Exception:
+                await channel.delete()
+                raise
+
+        config.ticket_count += 1
+        await config.save(update_fields=["ticket_count"])
+        if self.responses_enabled:
+            self.responses.track(ticket, member.guild.id)
+        if config.auto_close_after and self.inactivity_enabled:
+            self.inactivity.track(channel.id, member.guild.id, ticket.opened_at, config.auto_close_after * 3600)
+        await record_opened(config, ticket.opened_at)
+        if config.ping_support_roles:
+            await channel.send(
+                ", ".join(x.mention for x in support_roles),
+            )
+
+        answer_embeds = [
+            discord.Embed(title=label, description=answer, colour=discord.Colour.green())
+            for label, answer in answers.items()
+        ]
+        await send_with_controls(
+            channel,
+            member.mention,
+            embeds=[
+                discord.Embed(
+                    title="Ticket #{:,}".format(ticket.number),
+                    colour=discord.Colour.green(),
+                    timestamp=channel.created_at,
+                ).set_author(name=str(member), icon_url=member.display_avatar.url),
+                *answer_embeds,
+            ],
+        )
+        log_channel = self.log_channel(config)
+        if log_channel is not None:
+            await log_channel.send(
+                embed=discord.Embed(
+                    title="Ticket #{:,} opened!".format(ticket.number),
+                    description="Subject: {}".format(ticket.subject),
+                    colour=discord.Colour.blurple(),
+                    timestamp=channel.created_at,
+                )
+                .set_author(name=str(member), icon_url=member.display_avatar.url)
+                .add_field(name="Jump to channel", value=channel.mention)
+            )
+        return ticket, channel
+
+    async def advance_waitlist(self, guild: discord.Guild) -> None:
+        """Opens tickets for the people at the front of the guild's waitlist, for as long as there is space."""
+        if not self.waitlist.size(guild.id):
+            return
+        async with self.waitlist.lock(guild.id):
+            config = await Guild.get_or_none(id=guild.id)
+            if config is None:
+                return
+            if config.support_enabled is False:
+                return await self.clear_waitlist(guild)
+            while entry := self.waitlist.peek(guild.id):
+                member = guild.get_member(entry.user)
+                if member is None or await Ticket.exists(author=entry.user, guild=config):
+                    await self.waitlist.remove(guild.id, entry.user)
+                    continue
+                category = await self.pick_category(guild, config)
+                if category is None:
+                    break
+                try:
+                    _, channel = await self.open_ticket(config, category, member, entry.answers)
+                except discord.HTTPException as e:
+                    # Leave them at the front of the queue for the next attempt.
+                    log.error("Failed to open waitlisted ticket for %s in %s: %s", member.id, guild.id, e)
+                    break
+                interaction = self.waitlist.interaction(guild.id, member.id)
+                await self.waitlist.remove(guild.id, member.id)
+                await self.notify_waiting(
+                    member, f"\N{INBOX TRAY} Your ticket in {guild.name} is now open: {channel.mention}", interaction
+                )
+
+    async def clear_waitlist(self, guild: discord.Guild) -> None:
+        """Empties a guild's waitlist once it stops accepting new tickets, telling everyone in it. Hold its lock."""
+        while entry := self.waitlist.peek(guild.id):
+            interaction = self.waitlist.interaction(guild.id, entry.user)
+            await self.waitlist.remove(guild.id, entry.user)
+            member = guild.get_member(entry.user)
+            if member is not None:
+                await self.notify_waiting(
+                    member,
+                    f"\N{NO ENTRY} {guild.name} has stopped accepting new tickets, so your place in the queue for one "
+                    "has been cancelled.",
+                    interaction,
+                )
+
+    @staticmethod
+    async def notify_waiting(member: discord.Member, content: str, interaction: discord.Interaction | None) -> None:
+        """Tells someone who was waiting for a ticket what happened to it: by DM, or else as a follow-up."""
+        try:
+            await member.send(content)
+            return
+        except discord.HTTPException:
+            pass
+        if interaction is not None:
+            try:
+                await interaction.followup.send(content, ephemeral=True)
+            except discord.HTTPException:
+                pass
 
     tickets_group = discord.SlashCommandGroup(
         "ticket", "Manage the current, or create a new ticket.", contexts={discord.InteractionContextType.guild}
@@ -75,6 +437,16 @@ class TicketCog(commands.Cog):
     @commands.max_concurrency(1, commands.BucketType.member, wait=False)
     async def new(self, ctx: discord.ApplicationContext):
         """Creates a new support ticket in the current server."""
+        # Turn away bursts before they cost any queries. Guilds' own limits are loaded in on_ready.
+        if not self.admission.acquire(ctx.guild.id):
+            retry_after = self.admission.bucket(ctx.guild.id).retry_after()
+            return await ctx.respond(
+                "Too many tickets are being opened in this server right now. Please try again in {}.".format(
+                    humanize.naturaldelta(datetime.timedelta(seconds=max(1.0, retry_after)))
+                ),
+                ephemeral=True,
+            )
+
         # First, we need to check to see if the guild has set the bot up. We see this by checking if the guild has an
         # entry in the Guilds table
         guild = await Guild.get_or_none(id=ctx.guild.id)
@@ -83,127 +455,15 @@ class TicketCog(commands.Cog):
                 "This server has not yet set the bot up. Please ask an administrator to run `/setup`.", ephemeral=True
             )
 
-        if guild.support_enabled is False:
-            return await ctx.respond("This server is not currently accepting new tickets.", ephemeral=False)
-
-        # Next, we need to check to see if the user has a ticket open, in this server.
-        ticket = await Ticket.get_or_none(author=ctx.author.id, guild=guild)
-        if ticket:
-            # Notify the user of the location of their ticket
-            channel = self.bot.get_channel(ticket.channel)
-            if not channel:
-                await ticket.delete()
-                return await ctx.respond(
-                    "Your previous ticket was not closed correctly. It has now been deleted, please try again.",
-                    ephemeral=True,
-                )
-
-            return await ctx.respond(
-                f"You already have a ticket open: <#{ticket.channel}>. Please go there first.", ephemeral=True
-            )
+        # In case another cluster changed them.
+        self.admission.configure(guild.id, guild.ticket_rate_limit, guild.ticket_burst)
+        if not await self.can_open_ticket(ctx.interaction, guild):
+            return
 
-        # If we've made it this far, we can create the ticket.
-        # First step is getting the guild's ticket category (if any)
-        category = self.bot.get_channel(guild.ticket_category)
-        if category is None and guild.ticket_category is not None:
-            guild.ticket_category = None
-            await guild.save()
-            return await ctx.respond("This server is not set up properly. Please ask an administrator to run `/setup`.")
-        else:
-            # We now need to check to see if we can create and manage channels in this category.
-            if not category.permissions_for(ctx.guild.me).manage_channels:
-                return await ctx.respond(
-                    "I do not have permission to manage channels in the ticket category. Please ask an administrator to"
-                    f" give me the `Manage Channels` permission in the category {category.name!r}",
-                    ephemeral=True,
-                )
-            elif len(category.channels) == 50:
-                return await ctx.respond(
-                    "The ticket category is full. Please wait for support to close some tickets.", ephemeral=True
-                )
-            elif len(category.channels) >= guild.max_tickets:
-                return await ctx.respond(
-                    "The ticket category is full. Please wait for support to close some tickets.", ephemeral=True
-                )
-            else:
-                if questions := await guild.questions.limit(5).all():
-                    questions_modal = QuestionsModal(questions)
-                    await ctx.send_modal(questions_modal)
-                    try:
-                        await asyncio.wait_for(questions_modal.wait(), timeout=600)
-                    except asyncio.TimeoutError:
-                        return
-                    else:
-                        answers = questions_modal.answers
-                else:
-                    answers = {}
-
-                await ctx.respond("Creating ticket...", ephemeral=True)
-                async with in_transaction() as tx:
-                    support_roles = list(filter(lambda r: r is not None, map(ctx.guild.get_role, guild.support_roles)))
-                    overwrites = {
-                        ctx.guild.default_role: no,
-                        ctx.user: yes,
-                        ctx.me: yes,
-                        **{r: yes for r in support_roles},
-                    }
-                    try:
-                        channel: discord.TextChannel = await category.create_text_channel(
-                            f"ticket-{guild.ticket_count}",
-                            overwrites=overwrites,
-                            position=0,
-                            reason=f"Ticket created by {ctx.author.name}.",
-                        )
-                    except discord.HTTPException as e:
-                        return await ctx.edit(content="Failed to create ticket - {!s}".format(e))
-                    try:
-                        ticket = await Ticket.create(
-                            number=guild.ticket_count,
-                            guild=guild,
-                            channel=channel.id,
-                            author=ctx.author.id,
-                            opened_at=discord.utils.utcnow(),
-                            using_db=tx,
-                        )
-                    except Exception as e:
-                        await channel.delete()
-                        await ctx.edit(content="Failed to create ticket - {!s}".format(e), ephemeral=True)
-                        raise
-                    else:
-                        guild.ticket_count += 1
-                        if guild.ping_support_roles:
-                            await channel.send(
-                                ", ".join(x.mention for x in support_roles),
-                            )
-
-                        answer_embeds = [
-                            discord.Embed(title=question.label, description=answer, colour=discord.Colour.green())
-                            for question, answer in answers.items()
-                        ]
-                        await channel.send(
-                            ctx.author.mention,
-                            embeds=[
-                                discord.Embed(
-                                    title="Ticket #{:,}".format(ticket.number),
-                                    colour=discord.Colour.green(),
-                                    timestamp=channel.created_at,
-                                ).set_author(name=str(ctx.author), icon_url=ctx.author.display_avatar.url),
-                                *answer_embeds,
-                            ],
-                        )
-                        log_channel = self.log_channel(guild)
-                        if log_channel is not None:
-                            await log_channel.send(
-                                embed=discord.Embed(
-                                    title="Ticket #{:,} opened!".format(ticket.number),
-                                    description="Subject: {}".format(ticket.subject),
-                                    colour=discord.Colour.blurple(),
-                                    timestamp=channel.created_at,
-                                )
-                                .set_author(name=str(ctx.author), icon_url=ctx.author.display_avatar.url)
-                                .add_field(name="Jump to channel", value=channel.mention)
-                            )
-                        return await ctx.edit(content="Ticket created! {}".format(channel.mention))
+        if form := await question_forms.get(guild):
+            # Creation carries on in on_interaction once (if ever) the form is submitted, so nothing waits for it here.
+            return await ctx.send_modal(TicketQuestionsModal(form, questions_id(guild.id, form.version), ctx.author.id))
+        await self.finish_new(ctx.interaction, guild, {})
 
     @tickets_group.command()
     async def info(self, ctx: discord.ApplicationContext):
@@ -225,6 +485,60 @@ class TicketCog(commands.Cog):
         )
         return await ctx.respond(embed=embed, ephemeral=True)
 
+    @tickets_group.command(name="stats")
+    @discord.guild_only()
+    async def stats(
+        self,
+        ctx: discord.ApplicationContext,
+        days: discord.Option(int, description="How many days back to include.", min_value=1, max_value=365, default=30),
+    ):
+        """Shows ticket statistics for this server. Support only."""
+        await ctx.defer(ephemeral=True)
+        with read_replica():
+            guild = await Guild.get_or_none(id=ctx.guild.id)
+        if guild is None:
+            return await ctx.respond("This server has not yet been configured. Please use /setup.", ephemeral=True)
+        if not self.is_support(guild, ctx.author) and not ctx.author.guild_permissions.manage_guild:
+            return await ctx.respond("You are not a support member.", ephemeral=True)
+
+        with read_replica():
+            rows, summary = await summarise(ctx.guild.id, days)
+
+        def duration(seconds: float | None) -> str:
+            return "N/A" if seconds is None else humanize.naturaldelta(datetime.timedelta(seconds=seconds))
+
+        embed = discord.Embed(
+            title="Ticket stats for the last {:,} days".format(days),
+            description=f"**Opened**: {summary['opened']:,}\n"
+            f"**Closed**: {summary['closed']:,}\n"
+            f"**Median time to close**: {duration(summary['median_close_time'])}\n"
+            f"**95th percentile time to close**: {duration(summary['p95_close_time'])}\n"
+            f"**Median time to first response**: {duration(summary['median_first_response'])}\n"
+            f"**95th percentile time to first response**: {duration(summary['p95_first_response'])}",
+            colour=discord.Colour.blurple(),
+            timestamp=discord.utils.utcnow(),
+        )
+        waiting = self.responses.awaiting_response(ctx.guild.id)
+        if waiting:
+            embed.add_field(
+                name="Awaiting a first response",
+                value="{:,} open ticket{}, the oldest opened {}".format(
+                    len(waiting),
+                    "" if len(waiting) == 1 else "s",
+                    discord.utils.format_dt(waiting[0].opened_at, "R"),
+                ),
+                inline=False,
+            )
+        for row in rows[-7:]:
+            embed.add_field(
+                name=discord.utils.format_dt(
+                    datetime.datetime.combine(row.day, datetime.time(), datetime.timezone.utc), "d"
+                ),
+                value=f"Opened: {row.opened:,}\nClosed: {row.closed:,}\nMedian: {duration(row.median_close_time)}\n"
+                f"First response: {duration(row.median_first_response)}",
+            )
+        return await ctx.respond(embed=embed, ephemeral=True)
+
     @tickets_group.command(name="add-member")
     async def add_member(self, ctx: discord.ApplicationContext, member: discord.Member):
         """Adds a member to this ticket. Support only."""
@@ -276,6 +590,69 @@ class TicketCog(commands.Cog):
             ephemeral=True,
         )
 
+    @tickets_group.command(name="add-members")
+    @discord.guild_only()
+    async def add_members(
+        self,
+        ctx: discord.ApplicationContext,
+        targets: discord.Option(str, description="The members and/or roles to add, as mentions or IDs."),
+    ):
+        """Adds several members and/or roles to this ticket at once. Support only."""
+        await ctx.defer()
+        await self.add_targets(ctx.interaction, targets)
+
+    @tickets_group.command(name="remove-members")
+    @discord.guild_only()
+    async def remove_members(
+        self,
+        ctx: discord.ApplicationContext,
+        targets: discord.Option(str, description="The members and/or roles to remove, as mentions or IDs."),
+    ):
+        """Removes several members and/or roles from this ticket at once. Support only."""
+        await ctx.defer(ephemeral=True)
+        ticket = await Ticket.get_or_none(channel=ctx.channel.id)
+        if not ticket:
+            return await ctx.respond("This channel is not a ticket.", ephemeral=True)
+
+        await ticket.fetch_related("guild")
+        if not self.is_support(ticket.guild, ctx.author):
+            return await ctx.respond("You are not a support member.", ephemeral=True)
+        if not ctx.channel.permissions_for(ctx.me).manage_permissions:
+            return await ctx.respond("I don't have permission to remove members.", ephemeral=True)
+
+        changes = {}
+        skipped = []
+        for target in self.resolve_targets(ctx.guild, targets):
+            if isinstance(target, discord.Member):
+                if target.id == ticket.author or target == ctx.me:
+                    skipped.append(target)
+                elif target != ctx.author and self.is_support(ticket.guild, target):
+                    skipped.append(target)
+                else:
+                    changes[target] = no
+            elif target.id in self.support_cache.role_ids(ticket.guild) or target.is_default():
+                skipped.append(target)
+            else:
+                changes[target] = no
+
+        if changes:
+            await self.apply_overwrites(ctx.channel, changes, f"Removed by {ctx.author}")
+            await ctx.channel.send(
+                "\N{OUTBOX TRAY} {} {} removed from the ticket.".format(
+                    ", ".join(x.mention for x in changes), "was" if len(changes) == 1 else "were"
+                ),
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+        if skipped:
+            return await ctx.respond(
+                "Did not remove {} - ticket authors, support members and support roles cannot be removed "
+                "this way.".format(", ".join(x.mention for x in skipped)),
+                ephemeral=True,
+            )
+        if not changes:
+            return await ctx.respond("Nobody to remove.", ephemeral=True)
+        return await ctx.respond("Done.", ephemeral=True)
+
     @commands.user_command(name="Remove from current ticket")
     async def remove_member_from_list(self, ctx: discord.ApplicationContext, member: discord.Member):
         await ctx.defer(ephemeral=True)
@@ -306,9 +683,310 @@ class TicketCog(commands.Cog):
             ephemeral=True,
         )
 
+    async def can_open_ticket(self, interaction: discord.Interaction, guild: Guild) -> bool:
+        """Checks whether the user can open a ticket right now, telling them why not if they can't."""
+        if guild.support_enabled is False:
+            await interaction.respond("This server is not currently accepting new tickets.", ephemeral=False)
+            return False
+
+        # Next, we need to check to see if the user has a ticket open, in this server.
+        ticket = await Ticket.get_or_none(author=interaction.user.id, guild=guild)
+        if ticket:
+            # Notify the user of the location of their ticket
+            channel = self.bot.get_channel(ticket.channel)
+            if not channel:
+                await ticket.delete()
+                await interaction.respond(
+                    "Your previous ticket was not closed correctly. It has now been deleted, please try again.",
+                    ephemeral=True,
+                )
+                return False
+
+            await interaction.respond(
+                f"You already have a ticket open: <#{ticket.channel}>. Please go there first.", ephemeral=True
+            )
+            return False
+
+        # If they're already waiting for a ticket, retrying shouldn't do anything but tell them where they are.
+        position = self.waitlist.position(guild.id, interaction.user.id)
+        if position is not None:
+            await interaction.respond(
+                f"You are already waiting for a ticket, at position #{position:,} in the queue. "
+                "I'll let you know as soon as it's open.",
+                ephemeral=True,
+            )
+            return False
+
+        # Then, that the guild's ticket category (if any) is usable.
+        category = self.bot.get_channel(guild.ticket_category) if guild.ticket_category is not None else None
+        if category is None and guild.ticket_category is not None:
+            guild.ticket_category = None
+            await guild.save()
+            await interaction.respond(
+                "This server is not set up properly. Please ask an administrator to run `/setup`."
+            )
+            return False
+        if category is None and not guild.overflow_categories and not guild.auto_create_categories:
+            await interaction.respond(
+                "This server has no ticket category set. Please ask an administrator to run `/setup`.", ephemeral=True
+            )
+            return False
+        # We now need to check to see if we can create and manage channels in this category. Overflow categories are
+        # checked when they are added.
+        if category is not None and not category.permissions_for(interaction.guild.me).manage_channels:
+            await interaction.respond(
+                "I do not have permission to manage channels in the ticket category. Please ask an administrator to"
+                f" give me the `Manage Channels` permission in the category {category.name!r}",
+                ephemeral=True,
+            )
+            return False
+        return True
+
+    async def finish_new(self, interaction: discord.Interaction, guild: Guild, answers: dict[str, str]):
+        """Opens the user's ticket, or queues them up for one if there is no space."""
+        # Rather than have people retry until there's space, queue them up and open their ticket when there is.
+        category = None if self.waitlist.size(guild.id) else await self.pick_category(interaction.guild, guild)
+        if category is None:
+            position = await self.waitlist.add(guild, interaction.user.id, answers, interaction)
+            await interaction.respond(
+                f"The ticket categories are full, so you've been added to the queue at position #{position:,}. "
+                "I'll let you know as soon as your ticket is open.",
+                ephemeral=True,
+            )
+            # In case there is space after all, e.g. the max tickets setting was raised.
+            return await self.advance_waitlist(interaction.guild)
+
+        await interaction.respond("Creating ticket...", ephemeral=True)
+        try:
+            _, channel = await self.open_ticket(guild, category, interaction.user, answers)
+        except discord.HTTPException as e:
+            return await interaction.edit_original_response(content="Failed to create ticket - {!s}".format(e))
+        except Exception as e:
+            await interaction.edit_original_response(content="Failed to create ticket - {!s}".format(e))
+            raise
+        return await interaction.edit_original_response(content="Ticket created! {}".format(channel.mention))
+
+    async def submit_questions(self, interaction: discord.Interaction, guild_id: int, version: str):
+        """Carries on creating a ticket once its questions form has been submitted."""
+        key = (guild_id, interaction.user.id)
+        if key in self.creating:
+            return await interaction.respond("Your ticket is already being created.", ephemeral=True)
+        self.creating.add(key)
+        try:
+            guild = await Guild.get_or_none(id=guild_id)
+            if guild is None or guild_id != interaction.guild_id:
+                return await interaction.respond(
+                    "This server has not yet set the bot up. Please ask an administrator to run `/setup`.",
+                    ephemeral=True,
+                )
+            form = await question_forms.get(guild)
+            if form.version != version:
+                return await interaction.respond(
+                    "This server's questions changed while you were answering them. Please run `/ticket new` again.",
+                    ephemeral=True,
+                )
+            if not await self.can_open_ticket(interaction, guild):
+                return
+            values = modal_values(interaction)
+            answers = {question.label: values.get(str(question.entry_id), "") for question in form.questions}
+            await self.finish_new(interaction, guild, answers)
+        finally:
+            self.creating.discard(key)
+
+    async def close_ticket(self, interaction: discord.Interaction, reason: str, *, confirm: bool = False):
+        """Closes the ticket in the interaction's channel, by command or button - only one at a time per channel.
+        With `confirm`, asks the user to confirm first."""
+        if interaction.channel_id in self.closing:
+            return await interaction.respond("This ticket is already being closed.", ephemeral=True)
+        self.closing.add(interaction.channel_id)
+        try:
+            ticket = await Ticket.get_or_none(channel=interaction.channel_id)
+            if not ticket:
+                return await interaction.respond("This channel is not a ticket.", ephemeral=True)
+            await ticket.fetch_related("guild")
+            if not self.is_support(ticket.guild, interaction.user):
+                if ticket.author != interaction.user.id:
+                    return await interaction.respond(content="You are not a support member.", ephemeral=True)
+
+            if ticket.locked and not interaction.user.guild_permissions.administrator:
+                return await interaction.respond(
+                    "This ticket is currently locked, and as such cannot be closed.", ephemeral=True
+                )
+
+            if confirm:
+                view = ConfirmCustomView(show_cancel_button=False)
+                view.ctx = interaction
+                await interaction.respond("Are you sure you want to close this ticket?", view=view, ephemeral=True)
+                view.message = await interaction.original_response()
+                await view.wait()
+                if view.chosen is not True:
+                    return await interaction.edit_original_response(content="Ticket was not closed.", view=None)
+                await interaction.edit_original_response(content="Closing ticket...", view=None)
+                # It may have been locked while they were deciding.
+                await ticket.refresh_from_db(fields=["locked"])
+                if ticket.locked and not interaction.user.guild_permissions.administrator:
+                    return await interaction.edit_original_response(
+                        content="This ticket is currently locked, and as such cannot be closed."
+                    )
+
+            logged = await self.send_log(ticket, reason, interaction.user)
+            if logged:
+                await interaction.respond("Logged ticket. Closing now!")
+            else:
+                await interaction.respond("Closing now!")
+
+            await self.finish_close(ticket, interaction.channel, interaction.user, reason)
+        finally:
+            self.closing.discard(interaction.channel_id)
+
+    async def finish_close(self, ticket: Ticket, channel: discord.TextChannel, closer: discord.Member, reason: str):
+        """Moves a ticket into the closed history and deletes its channel, once it has been logged."""
+        if state := self.responses.untrack(channel.id):
+            state.apply(ticket)
+        await record_closed(ticket, closer.id, reason, discord.utils.utcnow())
+        self.inactivity.untrack(channel.id)
+        await channel.delete(reason="Closed by {!s}.".format(closer))
+        await self.advance_waitlist(channel.guild)
+
+    async def track_inactivity(self, guild_ids) -> int:
+        """(Re)starts tracking the inactivity of every open ticket in the given guilds that have auto-close enabled."""
+        guild_ids = list(guild_ids)
+        for guild_id in guild_ids:
+            self.inactivity.untrack_guild(guild_id)
+        tickets = await Ticket.filter(guild__id__in=guild_ids, guild__auto_close_after__isnull=False).select_related(
+            "guild"
+        )
+        for ticket in tickets:
+            self.inactivity.track(
+                ticket.channel,
+                ticket.guild.id,
+                ticket.last_activity or ticket.opened_at,
+                ticket.guild.auto_close_after * 3600,
+                ticket.inactivity_warned,
+            )
+        return len(tickets)
+
+    async def warn_inactive(self, timer: TicketTimer):
+        channel = self.bot.get_channel(timer.channel_id)
+        if channel is None:
+            return self.inactivity.untrack(timer.channel_id)
+        await channel.send(
+            "\N{ALARM CLOCK} This ticket has been inactive for a while, and will be closed {} unless someone sends a"
+            " message.".format(discord.utils.format_dt(timer.closes_at, "R"))
+        )
+        timer.warned = True
+        self.inactivity.mark_dirty(timer.channel_id)
+        self.inactivity.reschedule(timer)
+
+    async def close_inactive(self, timer: TicketTimer):
+        channel = self.bot.get_channel(timer.channel_id)
+        ticket = await Ticket.get_or_none(channel=timer.channel_id)
+        if channel is None or ticket is None:
+            return self.inactivity.untrack(timer.channel_id)
+        if ticket.locked:
+            # Locked tickets can only be closed by an administrator, so start counting again.
+            self.inactivity.touch(timer.channel_id, discord.utils.utcnow())
+            return self.inactivity.reschedule(timer)
+        await ticket.fetch_related("guild")
+        reason = "Closed automatically after {} of inactivity.".format(
+            humanize.naturaldelta(datetime.timedelta(seconds=timer.timeout))
+        )
+        await self.send_log(ticket, reason, channel.guild.me)
+        await self.finish_close(ticket, channel, channel.guild.me, reason)
+
+    async def toggle_lock(self, interaction: discord.Interaction):
+        """Locks or unlocks the ticket in the interaction's channel, by command or button - only one at a time per
+        channel."""
+        if interaction.channel_id in self.locking:
+            return await interaction.respond("This ticket is already being locked or unlocked.", ephemeral=True)
+        self.locking.add(interaction.channel_id)
+        try:
+            ticket = await Ticket.get_or_none(channel=interaction.channel_id)
+            if not ticket:
+                return await interaction.respond("This channel is not a ticket.", ephemeral=True)
+            await ticket.fetch_related("guild")
+            if not self.is_support(ticket.guild, interaction.user):
+                return await interaction.respond(content="You are not a support member.", ephemeral=True)
+
+            await interaction.response.defer()
+            ticket.locked = not ticket.locked
+            await ticket.save()
+            can_rename = interaction.channel.permissions_for(interaction.guild.me).manage_channels
+            if ticket.locked:
+                if can_rename:
+                    self.renames.schedule(interaction.channel, "\N{LOCK}-ticket-{}".format(ticket.number))
+                return await interaction.respond(
+                    "\N{LOCK} Ticket is now locked, so only administrators can close it. "
+                    "Use the Lock button or `/ticket lock` again to unlock it.",
+                    ephemeral=False,
+                )
+            else:
+                if can_rename:
+                    self.renames.schedule(interaction.channel, "ticket-{}".format(ticket.number))
+                return await interaction.respond(
+                    "\N{OPEN LOCK} Ticket is now unlocked, so anyone can close it. "
+                    "Use the Lock button or `/ticket lock` again to lock it.",
+                    ephemeral=False,
+                )
+        finally:
+            self.locking.discard(interaction.channel_id)
+
+    async def add_targets(self, interaction: discord.Interaction, targets: str):
+        ticket = await Ticket.get_or_none(channel=interaction.channel_id)
+        if not ticket:
+            return await interaction.respond("This channel is not a ticket.", ephemeral=True)
+        await ticket.fetch_related("guild")
+        if not self.is_support(ticket.guild, interaction.user):
+            return await interaction.respond("You are not a support member.", ephemeral=True)
+        if not interaction.channel.permissions_for(interaction.guild.me).manage_permissions:
+            return await interaction.respond("I don't have permission to add members.", ephemeral=True)
+
+        changes = {}
+        for target in self.resolve_targets(interaction.guild, targets):
+            if isinstance(target, discord.Member):
+                if interaction.channel.permissions_for(target).read_messages:
+                    continue
+            elif interaction.channel.overwrites_for(target).read_messages is True:
+                continue
+            changes[target] = yes
+
+        if not changes:
+            return await interaction.respond("Everyone you listed is already in this ticket.", ephemeral=True)
+        await self.apply_overwrites(interaction.channel, changes, f"Added by {interaction.user}")
+        await interaction.respond(
+            "\N{INBOX TRAY} {} {} been added to this ticket. Say hi!".format(
+                ", ".join(target.mention for target in changes), "has" if len(changes) == 1 else "have"
+            ),
+            allowed_mentions=discord.AllowedMentions(users=True, roles=False),
+        )
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Handles the persistent controls on ticket intro messages, and ticket question forms being submitted.
+        See trident.utils.controls."""
+        if interaction.type not in (discord.InteractionType.component, discord.InteractionType.modal_submit):
+            return
+        if interaction.guild is None:
+            return
+        if interaction.type is discord.InteractionType.modal_submit:
+            if questions := parse_questions_id(interaction.custom_id):
+                return await self.submit_questions(interaction, *questions)
+        action = parse_control_id(interaction.custom_id)
+        if action is None:
+            return
+
+        if interaction.type is discord.InteractionType.modal_submit:
+            if action == ADD_MEMBER:
+                await self.add_targets(interaction, modal_values(interaction).get("targets", ""))
+        elif action == CLOSE:
+            await self.close_ticket(interaction, "Closed with the close button.", confirm=True)
+        elif action == LOCK:
+            await self.toggle_lock(interaction)
+        elif action == ADD_MEMBER:
+            await interaction.response.send_modal(AddMemberModal())
+
     @tickets_group.command(name="close")
     @discord.guild_only()
-    @commands.max_concurrency(1, commands.BucketType.channel, wait=False)
     async def close(
         self,
         ctx: discord.ApplicationContext,
@@ -319,67 +997,13 @@ class TicketCog(commands.Cog):
         ),
     ):
         """Closes this ticket. Support or author only."""
-        ticket = await Ticket.get_or_none(channel=ctx.channel.id)
-        if not ticket:
-            return await ctx.respond("This channel is not a ticket.", ephemeral=True)
-        await ticket.fetch_related("guild")
-        if not self.is_support(ticket.guild, ctx.author):
-            if ticket.author != ctx.author.id:
-                return await ctx.respond(content="You are not a support member.", ephemeral=True)
-
-        if ticket.locked and not ctx.author.guild_permissions.administrator:
-            return await ctx.respond("This ticket is currently locked, and as such cannot be closed.", ephemeral=True)
-
-        logged = await self.send_log(ticket, reason, ctx.author)
-        if logged:
-            await ctx.respond("Logged ticket. Closing now!")
-        else:
-            await ctx.respond("Closing now!")
-
-        await ticket.delete()
-        await ctx.channel.delete(reason="Closed by {!s}.".format(ctx.author))
+        await self.close_ticket(ctx.interaction, reason)
 
     @tickets_group.command(name="lock")
     @discord.guild_only()
-    @commands.max_concurrency(1, commands.BucketType.channel, wait=False)
     async def lock(self, ctx: discord.ApplicationContext):
         """Prevents the current ticket from being closed. Support only."""
-        ticket = await Ticket.get_or_none(channel=ctx.channel.id)
-        if not ticket:
-            return await ctx.respond("This channel is not a ticket.", ephemeral=True)
-        await ticket.fetch_related("guild")
-        if not self.is_support(ticket.guild, ctx.author):
-            return await ctx.respond(content="You are not a support member.", ephemeral=True)
-
-        await ctx.defer()
-        ticket.locked = not ticket.locked
-        await ticket.save()
-        if ticket.locked:
-            if ctx.channel.permissions_for(ctx.me).manage_channels:
-                if not ctx.channel.name.startswith("\N{LOCK}"):
-                    await asyncio.wait_for(
-                        ctx.channel.edit(
-                            name="\N{LOCK}-ticket-{}".format(ticket.number),
-                        ),
-                        timeout=10,
-                    )
-            return await ctx.respond(
-                "\N{LOCK} Ticket is now locked, so only administrators can close it. "
-                "Run this command again to unlock it.",
-                ephemeral=False,
-            )
-        else:
-            if ctx.channel.permissions_for(ctx.me).manage_channels:
-                if ctx.channel.name.startswith("\N{LOCK}"):
-                    self.bot.loop.create_task(
-                        ctx.channel.edit(
-                            name="ticket-{}".format(ticket.number),
-                        )
-                    )
-            return await ctx.respond(
-                "\N{OPEN LOCK} Ticket is now unlocked, so anyone can close it. " "Run this command again to lock it.",
-                ephemeral=False,
-            )
+        await self.toggle_lock(ctx.interaction)
 
 
 def setup(bot):
@@ -0,0 +1,185 @@
+"""Runs Trident as several clustered processes, each owning a contiguous range of shards.
+
+Usage: `python launcher.py` from the same directory as `main.py`. Configured via `[trident.cluster]` in config.toml:
+
+    [trident.cluster]
+    clusters = 4          # number of worker processes
+    shard_count = 16      # total shards. Omit to use Discord's recommendation.
+    health_interval = 30  # seconds between health reports from each cluster
+    ready_timeout = 600   # how long to wait for a cluster to become ready before starting the next anyway
+
+Every cluster connects to the same database. Clusters are started one at a time, and the next cluster is only
+started once the previous one reports it is ready, so that no more than one process is identifying at once
+(each process identifies its own shards one after another, within the identify concurrency)."""
+
+import logging
+import multiprocessing
+import sys
+import time
+
+import httpx
+import tomllib
+
+log = logging.getLogger("trident.launcher")
+
+
+def fetch_gateway_info(token: str) -> tuple[int, int]:
+    """Returns (recommended shard count, max identify concurrency) from Discord."""
+    response = httpx.get(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": "Bot " + token},
+        timeout=30,
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data["shards"], data.get("session_start_limit", {}).get("max_concurrency", 1)
+
+
+def split_shards(shard_count: int, clusters: int) -> list[list[int]]:
+    """Splits shard IDs into `clusters` contiguous ranges, whose sizes differ by at most one shard."""
+    clusters = max(1, min(clusters, shard_count))
+    per_cluster, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for cluster_id in range(clusters):
+        # The first `extra` clusters take one shard more.
+        end = start + per_cluster + (cluster_id < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def run_cluster(cluster_id: int, shard_ids: list[int], shard_count: int, pipe) -> None:
+    sys.path.append("..")
+    import tortoise
+    from main import install_uvloop, load_config, main
+
+    install_uvloop(load_config())
+    tortoise.run_async(
+        main(cluster={"id": cluster_id, "shard_ids": shard_ids, "shard_count": shard_count, "pipe": pipe})
+    )
+
+
+class Cluster:
+    def __init__(self, cluster_id: int, shard_ids: list[int], shard_count: int):
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process: multiprocessing.Process | None = None
+        self.pipe = None
+        self.ready = False
+        self.last_health: dict | None = None
+        self.last_seen = 0.0
+
+    def start(self) -> None:
+        parent, child = multiprocessing.Pipe()
+        self.pipe = parent
+        self.ready = False
+        self.last_health = None
+        self.last_seen = time.monotonic()
+        self.process = multiprocessing.Process(
+            target=run_cluster,
+            args=(self.id, self.shard_ids, self.shard_count, child),
+            name="trident-cluster-%d" % self.id,
+            daemon=False,
+        )
+        self.process.start()
+        log.info("Started cluster %d (shards %s) as PID %d.", self.id, self.shard_ids, self.process.pid)
+
+    def poll(self) -> None:
+        while self.pipe is not None and self.pipe.poll():
+            try:
+                kind, payload = self.pipe.recv()
+            except (EOFError, OSError):
+                break
+            self.last_seen = time.monotonic()
+            if kind == "ready":
+                self.ready = True
+                log.info("Cluster %d is ready.", self.id)
+            elif kind == "health":
+                self.last_health = payload
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Launcher:
+    def __init__(self, config: dict):
+        self.config = config
+        cluster_config = config["trident"].get("cluster", {})
+        self.cluster_count = cluster_config.get("clusters", 1)
+        self.shard_count = cluster_config.get("shard_count")
+        self.health_interval = cluster_config.get("health_interval", 30)
+        self.ready_timeout = cluster_config.get("ready_timeout", 600)
+        self.clusters: list[Cluster] = []
+
+    @property
+    def token(self) -> str:
+        trident = self.config["trident"]
+        return trident["token"] if trident.get("debug", False) is False else trident["debug_token"]
+
+    def wait_until_ready(self, cluster: Cluster) -> None:
+        deadline = time.monotonic() + self.ready_timeout
+        while not cluster.ready and cluster.alive and time.monotonic() < deadline:
+            cluster.poll()
+            time.sleep(1)
+        if not cluster.ready:
+            log.warning("Cluster %d did not become ready in time, continuing anyway.", cluster.id)
+
+    def report(self) -> None:
+        now = time.monotonic()
+        for cluster in self.clusters:
+            cluster.poll()
+            health = cluster.last_health or {}
+            stale = now - cluster.last_seen > self.health_interval * 3
+            log.info(
+                "Cluster %d: %s, %s guilds, latencies %s",
+                cluster.id,
+                "down" if not cluster.alive else ("unresponsive" if stale else "ok"),
+                health.get("guilds", "?"),
+                health.get("latencies", "?"),
+            )
+
+    def run(self) -> None:
+        shard_count, max_concurrency = fetch_gateway_info(self.token)
+        shard_count = self.shard_count or shard_count
+        ranges = split_shards(shard_count, self.cluster_count)
+        log.info(
+            "Launching %d shards across %d clusters (identify concurrency %d).",
+            shard_count,
+            len(ranges),
+            max_concurrency,
+        )
+        for cluster_id, shard_ids in enumerate(ranges):
+            cluster = Cluster(cluster_id, shard_ids, shard_count)
+            self.clusters.append(cluster)
+            cluster.start()
+            self.wait_until_ready(cluster)
+
+        try:
+            while True:
+                time.sleep(self.health_interval)
+                self.report()
+                for cluster in self.clusters:
+                    if not cluster.alive:
+                        log.warning("Cluster %d exited with code %s, restarting.", cluster.id, cluster.process.exitcode)
+                        cluster.start()
+                        self.wait_until_ready(cluster)
+        except KeyboardInterrupt:
+            for cluster in self.clusters:
+                if cluster.alive:
+                    cluster.process.terminate()
+            for cluster in self.clusters:
+                cluster.process.join(30)
+
+
+if __name__ == "__main__":
+    with open("config.toml", "rb") as config_file:
+        _config = tomllib.load(config_file)
+    _config.setdefault("trident", {})
+    sys.path.append("..")
+    from trident.utils.logs import setup_logging
+
+    setup_logging(_config)
+    Launcher(_config).run()
@@ -1,3 +1,4 @@
+import asyncio
 import tomllib
 import sys
 import logging
@@ -7,23 +8,130 @@ import discord
 import httpx
 import tortoise
 from discord.ext import commands
+from tortoise.utils import generate_schema_for_client
 
 
-class Bot(commands.Bot):
-    def __init__(self):
-        with open("config.toml", "rb") as config_file:
-            self.config = tomllib.load(config_file)
-            self.config.setdefault("trident", {})
-            self.config["trident"].setdefault("debug", False)
-            self.config["trident"].setdefault("debug_guilds", None)
-            self.config["trident"].setdefault("owner_id", None)
+def load_config() -> dict:
+    with open("config.toml", "rb") as config_file:
+        config = tomllib.load(config_file)
+    config.setdefault("trident", {})
+    config["trident"].setdefault("debug", False)
+    config["trident"].setdefault("debug_guilds", None)
+    config["trident"].setdefault("owner_id", None)
+    config["trident"].setdefault("cluster", {})
+    config["trident"].setdefault("cache", {})
+    config["trident"].setdefault("loop_monitor", {})
+    config["trident"].setdefault("runtime", {})
+    config["trident"].setdefault("ticket_rate_limit", {})
+    config["trident"].setdefault("inactivity", {})
+    config["trident"].setdefault("responses", {})
+    config["trident"].setdefault("logging", {})
+    return config
 
-        intents = discord.Intents.default()
+
+def install_uvloop(config: dict) -> bool:
+    """Installs uvloop's event loop policy if `[trident.runtime] uvloop` is enabled and uvloop is installed.
+
+    Must be called before the event loop is created."""
+    if not config["trident"]["runtime"].get("uvloop", False):
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        logging.getLogger("trident.runtime").warning("uvloop is enabled in config.toml, but is not installed.")
+        return False
+    uvloop.install()
+    return True
+
+
+def build_intents(names: list[str] | None) -> discord.Intents:
+    """Builds intents from a list of intent names (e.g. `["guilds", "guild_messages"]`). None means the defaults."""
+    if names is None:
+        return discord.Intents.default()
+    return discord.Intents(**{name: True for name in names})
+
+
+# The intent each member cache flag needs, for those that need one.
+MEMBER_CACHE_FLAG_INTENTS = {"voice": "voice_states", "joined": "members"}
+
+
+def build_member_cache_flags(value: str | list[str] | None, intents: discord.Intents) -> discord.MemberCacheFlags:
+    """Builds member cache flags from "all", "none", a flag name, or a list of flag names. None means derive from the
+    intents. Raises ValueError for unknown flags, or flags whose intent is not enabled."""
+    if value is None:
+        return discord.MemberCacheFlags.from_intents(intents)
+    if value == "none":
+        return discord.MemberCacheFlags.none()
+    if value == "all":
+        names = list(discord.MemberCacheFlags.VALID_FLAGS)
+    elif isinstance(value, str):
+        names = [value]
+    else:
+        names = list(value)
+
+    # Not MemberCacheFlags(**kwargs), as that starts with every flag enabled.
+    flags = discord.MemberCacheFlags.none()
+    for name in names:
+        if name not in discord.MemberCacheFlags.VALID_FLAGS:
+            raise ValueError("%r is not a valid member cache flag ([trident.cache] members)." % name)
+        intent = MEMBER_CACHE_FLAG_INTENTS.get(name)
+        if intent is not None and not getattr(intents, intent):
+            raise ValueError(
+                "The %r member cache flag needs the %r intent, which is not enabled ([trident.cache] intents)."
+                % (name, intent)
+            )
+        setattr(flags, name, True)
+    return flags
+
+
+def memory_usage() -> int | None:
+    """Returns the resident set size of this process in bytes, if it can be determined."""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            import resource
+        except ImportError:
+            return None
+        # ru_maxrss is in kilobytes on Linux. This is the peak, not current, RSS, but is close enough at startup.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return psutil.Process().memory_info().rss
+
+
+class Bot(commands.AutoShardedBot):
+    def __init__(self, cluster: dict | None = None):
+        self.config = load_config()
+
+        # [trident.cache] lets operators trade cached state for memory. For example, this is all Trident needs:
+        #   intents = ["guilds"]
+        #   members = "interaction"
+        #   max_messages = 0
+        #   chunk_guilds_at_startup = false
+        # Without the members intent, looked-up memberships can't be invalidated on join/leave, so they expire sooner
+        # (see trident.utils.resolver).
+        cache_config = self.config["trident"]["cache"]
+        intents = build_intents(cache_config.get("intents"))
+        member_cache_flags = build_member_cache_flags(cache_config.get("members"), intents)
+        max_messages = cache_config.get("max_messages", 1000) or None
+
+        # When run by launcher.py, each process only runs its own range of shards.
+        # Otherwise, this process runs every shard (the shard count given in config, or Discord's recommendation).
+        self.cluster_id: int | None = None
+        self.cluster_pipe = None
+        shard_kwargs = {"shard_count": self.config["trident"]["cluster"].get("shard_count")}
+        if cluster is not None:
+            self.cluster_id = cluster["id"]
+            self.cluster_pipe = cluster["pipe"]
+            shard_kwargs = {"shard_ids": cluster["shard_ids"], "shard_count": cluster["shard_count"]}
 
         super().__init__(
             debug_guilds=self.config["trident"]["debug_guilds"] if self.config["trident"]["debug"] is True else None,
             owner_id=self.config["trident"]["owner_id"],
             intents=intents,
+            member_cache_flags=member_cache_flags,
+            max_messages=max_messages,
+            chunk_guilds_at_startup=cache_config.get("chunk_guilds_at_startup", intents.members),
+            **shard_kwargs,
         )
 
         self.load_extension("jishaku")
@@ -38,18 +146,104 @@ class Bot(commands.Bot):
 
         self.server = None
         self.server_task = None
+        self.health_task = None
+        self.cache_reported = False
+        # Imported lazily, as `trident` is only importable once the __main__ block has extended sys.path.
+        from trident.utils.resolver import UserResolver
+
+        resolver_ttl = cache_config.get("resolver_ttl", 300)
+        # Without the members intent, nothing invalidates memberships when people join or leave, so they must expire.
+        member_ttl = cache_config.get("resolver_member_ttl", resolver_ttl if intents.members else min(resolver_ttl, 30))
+        self.resolver = UserResolver(
+            self,
+            ttl=resolver_ttl,
+            max_size=cache_config.get("resolver_size", 10_000),
+            member_ttl=member_ttl,
+        )
+        self.loop_monitor = None
+        monitor_config = dict(self.config["trident"]["loop_monitor"])
+        if monitor_config.pop("enabled", True):
+            from trident.utils.loopmonitor import LoopMonitor
+
+            self.loop_monitor = LoopMonitor(**monitor_config)
 
     async def start(self, token: str, *, reconnect: bool = True) -> None:
         self.started_at = discord.utils.utcnow()
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
         await super().start(token, reconnect=reconnect)
 
+    async def close(self) -> None:
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+        # Cogs are not unloaded on shutdown, so save what the ticket trackers are holding while the database is open.
+        ticket_cog = self.get_cog("TicketCog")
+        if ticket_cog is not None:
+            await ticket_cog.save_tracked()
+        await super().close()
+
     async def login(self, token: str) -> None:
         await super().login(token)
         self.connected_at = discord.utils.utcnow()
 
+    def dispatch(self, event_name: str, *args, **kwargs) -> None:
+        if event_name != "interaction":
+            return super().dispatch(event_name, *args, **kwargs)
+        from trident.utils.logs import bind, interaction_context, unbind
+
+        # Every listener task (and the command it invokes) is created here, so inherits the interaction's log context.
+        token = bind(**interaction_context(args[0]))
+        try:
+            super().dispatch(event_name, *args, **kwargs)
+        finally:
+            unbind(token)
+
+    async def on_member_join(self, member: discord.Member):
+        self.resolver.invalidate_member(member.guild.id, member.id)
+
+    async def on_member_remove(self, member: discord.Member):
+        self.resolver.invalidate_member(member.guild.id, member.id)
+
     async def on_ready(self):
         self.last_reconnect = discord.utils.utcnow()
-        print("Logged in as %s." % self.user)
+        logging.getLogger("trident").info("Logged in as %s.", self.user)
+        if not self.cache_reported:
+            self.cache_reported = True
+            self.report_cache_usage()
+        if self.cluster_pipe is not None:
+            self.cluster_pipe.send(("ready", None))
+            if self.health_task is None:
+                self.health_task = asyncio.create_task(self.report_health())
+
+    def report_cache_usage(self):
+        """Logs how much is cached, and roughly how much memory that costs per guild."""
+        log = logging.getLogger("trident.cache")
+        rss = memory_usage()
+        guilds = len(self.guilds) or 1
+        log.info(
+            "Cache: %d guilds, %d members, %d users, %d messages. RSS: %s (%s per guild).",
+            len(self.guilds),
+            sum(len(guild.members) for guild in self.guilds),
+            len(self.users),
+            len(self.cached_messages),
+            "unknown" if rss is None else "%.1f MiB" % (rss / 1048576),
+            "unknown" if rss is None else "%.1f KiB" % (rss / guilds / 1024),
+        )
+
+    async def report_health(self):
+        """Periodically sends this cluster's health to the launcher."""
+        interval = self.config["trident"]["cluster"].get("health_interval", 30)
+        while not self.is_closed():
+            self.cluster_pipe.send(
+                (
+                    "health",
+                    {
+                        "guilds": len(self.guilds),
+                        "latencies": {shard_id: round(latency * 1000) for shard_id, latency in self.latencies},
+                    },
+                )
+            )
+            await asyncio.sleep(interval)
 
     async def on_application_command_error(
         self, context: discord.ApplicationContext, exception: discord.DiscordException
@@ -86,25 +280,31 @@ class Bot(commands.Bot):
         await super().on_application_command_error(context, exception)
 
 
-async def main():
-    bot = Bot()
-    logging.basicConfig(
-        datefmt="%Y-%m-%d",
-        format="%(asctime)s - %(name)s - %(levelname)s: %(message)s",
-        level=bot.config["trident"].get("log_level", "INFO").upper(),
-    )
+async def main(cluster: dict | None = None):
+    from trident.migrations import apply_migrations
+    from trident.utils.logs import setup_logging
+    from trident.utils.pool import build_connections
+    from trident.utils.replicas import ReplicaRouter
+
+    setup_logging(load_config())
+    bot = Bot(cluster)
+    connections = build_connections(bot.config)
+    ReplicaRouter.configure([name for name in connections if name != "default"])
     await tortoise.Tortoise.init(
         config={
-            "connections": {"default": bot.config["database"]["url"]},
+            "connections": connections,
             "apps": {
                 "models": {
                     "models": ["trident.models"],
                     "default_connection": "default",
                 },
             },
+            "routers": [ReplicaRouter],
         }
     )
-    await tortoise.Tortoise.generate_schemas()
+    # Not Tortoise.generate_schemas(), as that would also try to create tables on the (read-only) replicas.
+    await generate_schema_for_client(tortoise.connections.get("default"), safe=True)
+    await apply_migrations(bot.config)
     return await bot.start(
         bot.config["trident"]["token"]
         if bot.config["trident"]["debug"] is False
@@ -114,4 +314,5 @@ async def main():
 
 if __name__ == "__main__":
     sys.path.append("..")
+    install_uvloop(load_config())
     tortoise.run_async(main())
@@ -0,0 +1,108 @@
+"""Idempotent schema migrations that Tortoise's generate_schemas() cannot express.
+
+generate_schemas() only creates indexes alongside the tables themselves, cannot create expression, descending or
+trigram indexes at all, and never adds new columns to existing tables. These are instead created here, on every
+startup, if they do not already exist. Indexes are built CONCURRENTLY so that large tables are not locked against
+writes, and any index left invalid by an interrupted build is dropped and rebuilt."""
+
+import logging
+
+from tortoise import connections
+
+__all__ = ("COLUMNS", "INDEXES", "TRIGRAM_INDEXES", "REPLACED_INDEXES", "apply_migrations")
+
+log = logging.getLogger("trident.migrations")
+
+# (table, column, definition) for columns added to tables after they were first created.
+COLUMNS = (
+    ("guilds", "ticket_rate_limit", "DOUBLE PRECISION"),
+    ("guilds", "ticket_burst", "INT"),
+    ("guilds", "overflow_categories", "JSONB NOT NULL DEFAULT '[]'"),
+    ("guilds", "auto_create_categories", "BOOL NOT NULL DEFAULT FALSE"),
+    ("guilds", "auto_close_after", "INT"),
+    ("tickets", "last_activity", "TIMESTAMPTZ"),
+    ("tickets", "inactivity_warned", "BOOL NOT NULL DEFAULT FALSE"),
+    ("tickets", "first_response_at", "TIMESTAMPTZ"),
+    ("tickets", "support_replies", "INT NOT NULL DEFAULT 0"),
+    ("tickets", "last_support_response", "TIMESTAMPTZ"),
+    ("closed_tickets", "first_response_time", "DOUBLE PRECISION"),
+    ("closed_tickets", "support_replies", "INT NOT NULL DEFAULT 0"),
+    ("ticket_daily_stats", "responded", "INT NOT NULL DEFAULT 0"),
+    ("ticket_daily_stats", "first_response_histogram", "JSONB NOT NULL DEFAULT '{}'"),
+    ("ticket_daily_stats", "median_first_response", "DOUBLE PRECISION"),
+)
+
+# Tortoise renders `name__iexact` and `name__icontains` on Postgres as `UPPER(CAST("name" AS VARCHAR)) = / LIKE ...`.
+# Expression indexes are only used for queries on the exact same expression, so those on tag names index this one.
+TAG_NAME_EXPRESSION = "upper(name::varchar)"
+
+# (index name, definition)
+INDEXES = (
+    # Tag names are case-insensitively unique within a guild. Also serves the `name__iexact` lookups in tags.py.
+    ("tags_guild_upper_name_uniq", f"UNIQUE INDEX {{concurrently}} {{name}} ON tags (guild_id, {TAG_NAME_EXPRESSION})"),
+    # Exact lookups compare against the stored (already lower-cased) name, which the expression index can't serve.
+    ("tags_guild_name_idx", "INDEX {concurrently} {name} ON tags (guild_id, name)"),
+    # /tag list orders a guild's tags by popularity.
+    ("tags_guild_uses_idx", "INDEX {concurrently} {name} ON tags (guild_id, uses DESC)"),
+    # /ticket new looks for an existing ticket by the same author.
+    ("tickets_guild_author_idx", "INDEX {concurrently} {name} ON tickets (guild_id, author)"),
+)
+
+# Only created when `[database] trigram_index = true`, as they need the pg_trgm extension.
+TRIGRAM_INDEXES = (
+    # Tag autocomplete and /tag list's search use `name__icontains`, i.e. `UPPER(CAST(name AS VARCHAR)) LIKE '%...%'`.
+    (
+        "tags_upper_name_trgm_idx",
+        f"INDEX {{concurrently}} {{name}} ON tags USING GIN (({TAG_NAME_EXPRESSION}) gin_trgm_ops)",
+    ),
+)
+
+# (old index name, replacement index name). Old indexes are dropped once their replacement has been built.
+REPLACED_INDEXES = (
+    # On lower(name) and plain name, which the queries Tortoise generates could never use.
+    ("tags_guild_lower_name_uniq", "tags_guild_upper_name_uniq"),
+    ("tags_name_trgm_idx", "tags_upper_name_trgm_idx"),
+)
+
+
+async def index_state(connection, name: str) -> bool | None:
+    """Returns whether an index is valid, or None if it does not exist."""
+    rows = await connection.execute_query_dict(
+        "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = $1", [name]
+    )
+    return rows[0]["indisvalid"] if rows else None
+
+
+async def apply_migrations(config: dict, connection_name: str = "default") -> None:
+    connection = connections.get(connection_name)
+    for table, column, definition in COLUMNS:
+        await connection.execute_script(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition};")
+
+    indexes = list(INDEXES)
+    if config["database"].get("trigram_index", False):
+        try:
+            await connection.execute_script("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        except Exception as e:
+            log.error("Unable to enable pg_trgm, skipping trigram indexes: %s", e)
+        else:
+            indexes += TRIGRAM_INDEXES
+
+    for name, definition in indexes:
+        state = await index_state(connection, name)
+        if state is True:
+            continue
+        if state is False:
+            log.warning("Index %s is invalid (interrupted build?), rebuilding it.", name)
+            await connection.execute_script(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+
+        log.info("Creating index %s.", name)
+        try:
+            await connection.execute_script("CREATE " + definition.format(concurrently="CONCURRENTLY", name=name) + ";")
+        except Exception as e:
+            # e.g. existing duplicate tag names preventing the unique index. Trident still works without it.
+            log.error("Failed to create index %s: %s", name, e)
+
+    for old, replacement in REPLACED_INDEXES:
+        if await index_state(connection, old) is not None and await index_state(connection, replacement) is True:
+            log.info("Dropping index %s, replaced by %s.", old, replacement)
+            await connection.execute_script(f"DROP INDEX CONCURRENTLY IF EXISTS {old};")
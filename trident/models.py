@@ -6,21 +6,33 @@ from tortoise import Model, fields
 
 class Guild(Model):
     class Meta:
+        # Columns added after the table was first created are added by trident/migrations.py
         table = "guilds"
 
     entry_id: uuid.UUID = fields.UUIDField(pk=True)
     id: int = fields.BigIntField(unique=True)
     ticket_count: int = fields.BigIntField(default=1)
     ticket_category: int | None = fields.BigIntField(null=True)
+    # Further categories to place tickets in, in order, once ticket_category fills up.
+    overflow_categories: list[int] = fields.JSONField(default=[])
+    auto_create_categories: bool = fields.BooleanField(default=False)
     log_channel: int | None = fields.BigIntField(null=True, unique=True)
     support_roles: list[int] = fields.JSONField(default=[])
     ping_support_roles: bool = fields.BooleanField(default=True)
     max_tickets: int = fields.IntField(default=50)
     support_enabled: bool = fields.BooleanField(default=True)
+    # Ticket creation rate limits. None uses the bot-wide defaults.
+    ticket_rate_limit: float | None = fields.FloatField(null=True)
+    ticket_burst: int | None = fields.IntField(null=True)
+    auto_close_after: int | None = fields.IntField(null=True)
+    """Hours a ticket can be inactive for before it is closed automatically, or None to never close them"""
 
     questions: fields.ReverseRelation["TicketQuestion"]
     tickets: fields.ReverseRelation["Ticket"]
     tags: fields.ReverseRelation["Tag"]
+    closed_tickets: fields.ReverseRelation["ClosedTicket"]
+    daily_stats: fields.ReverseRelation["TicketDailyStats"]
+    waitlist: fields.ReverseRelation["WaitlistEntry"]
 
 
 class TicketQuestion(Model):
@@ -41,6 +53,7 @@ class TicketQuestion(Model):
 
 class Ticket(Model):
     class Meta:
+        # Composite indexes, and columns added since the table was first created, are created by trident/migrations.py
         table = "tickets"
 
     entry_id: uuid.UUID = fields.UUIDField(pk=True)
@@ -53,10 +66,18 @@ class Ticket(Model):
     subject: str | None = fields.CharField(max_length=1024, null=True)
     opened_at: datetime.datetime = fields.DatetimeField(auto_now_add=True)
     locked: bool = fields.BooleanField(default=False)
+    # Written in batches by trident.utils.inactivity, so may lag behind by up to [trident.inactivity] flush_interval.
+    last_activity: datetime.datetime | None = fields.DatetimeField(null=True)
+    inactivity_warned: bool = fields.BooleanField(default=False)
+    # Written in batches by trident.utils.responses.
+    first_response_at: datetime.datetime | None = fields.DatetimeField(null=True)
+    support_replies: int = fields.IntField(default=0)
+    last_support_response: datetime.datetime | None = fields.DatetimeField(null=True)
 
 
 class Tag(Model):
     class Meta:
+        # Composite, expression and trigram indexes are created by trident/migrations.py
         table = "tags"
 
     entry_id: uuid.UUID = fields.UUIDField(pk=True)
@@ -69,3 +90,65 @@ class Tag(Model):
     author: int = fields.BigIntField()
     owner: int = fields.BigIntField()
     uses: int = fields.IntField(default=0)
+
+
+class ClosedTicket(Model):
+    class Meta:
+        # Columns added since the table was first created are added by trident/migrations.py
+        table = "closed_tickets"
+
+    entry_id: uuid.UUID = fields.UUIDField(pk=True)
+    guild: fields.ForeignKeyRelation[Guild] = fields.ForeignKeyField(
+        "models.Guild", related_name="closed_tickets", on_delete=fields.CASCADE
+    )
+    number: int = fields.IntField()
+    author: int = fields.BigIntField()
+    channel: int = fields.BigIntField()
+    subject: str | None = fields.CharField(max_length=1024, null=True)
+    opened_at: datetime.datetime = fields.DatetimeField()
+    closed_at: datetime.datetime = fields.DatetimeField()
+    closed_by: int = fields.BigIntField()
+    reason: str | None = fields.CharField(max_length=1500, null=True)
+    duration: float = fields.FloatField()
+    """Seconds between the ticket being opened and closed"""
+    first_response_time: float | None = fields.FloatField(null=True)
+    """Seconds between the ticket being opened and support first replying, if they ever did"""
+    support_replies: int = fields.IntField(default=0)
+
+
+class TicketDailyStats(Model):
+    class Meta:
+        # Columns added since the table was first created are added by trident/migrations.py
+        table = "ticket_daily_stats"
+        unique_together = (("guild", "day"),)
+
+    entry_id: uuid.UUID = fields.UUIDField(pk=True)
+    guild: fields.ForeignKeyRelation[Guild] = fields.ForeignKeyField(
+        "models.Guild", related_name="daily_stats", on_delete=fields.CASCADE
+    )
+    day: datetime.date = fields.DateField()
+    opened: int = fields.IntField(default=0)
+    closed: int = fields.IntField(default=0)
+    close_time_histogram: dict[str, int] = fields.JSONField(default={})
+    """Counts of tickets closed this day, bucketed by time-to-close (see trident.utils.rollups)"""
+    median_close_time: float | None = fields.FloatField(null=True)
+    p95_close_time: float | None = fields.FloatField(null=True)
+    responded: int = fields.IntField(default=0)
+    """Tickets first replied to by support this day"""
+    first_response_histogram: dict[str, int] = fields.JSONField(default={})
+    median_first_response: float | None = fields.FloatField(null=True)
+
+
+class WaitlistEntry(Model):
+    class Meta:
+        table = "ticket_waitlist"
+        unique_together = (("guild", "user"),)
+
+    entry_id: uuid.UUID = fields.UUIDField(pk=True)
+    guild: fields.ForeignKeyRelation[Guild] = fields.ForeignKeyField(
+        "models.Guild", related_name="waitlist", on_delete=fields.CASCADE
+    )
+    user: int = fields.BigIntField()
+    answers: dict[str, str] = fields.JSONField(default={})
+    """Their answers to the server's questions, by question label"""
+    queued_at: datetime.datetime = fields.DatetimeField(auto_now_add=True)
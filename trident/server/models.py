@@ -1,4 +1,5 @@
 import datetime
+import uuid
 
 from pydantic import BaseModel
 
@@ -19,6 +20,9 @@ __all__ = (
     "Ticket",
     "Tag",
     "TicketLockPayload",
+    "TicketDayStats",
+    "TicketStats",
+    "EventLoopStats",
     "convert_database_guild_to_JSON_model",
 )
 
@@ -219,7 +223,7 @@ class TicketQuestion(BaseModel):
 
 
 class GuildConfig(BaseModel):
-    entry_id: int
+    entry_id: uuid.UUID
     id: str
     ticketCounter: int
     ticketCategory: str | None
@@ -256,18 +260,71 @@ class TicketLockPayload(BaseModel):
     locked: bool
 
 
+class TicketDayStats(BaseModel):
+    day: datetime.date
+    opened: int
+    closed: int
+    medianCloseTime: float | None
+    """Median seconds taken to close tickets closed this day"""
+    p95CloseTime: float | None
+    responded: int
+    medianFirstResponse: float | None
+    """Median seconds taken for support to first reply to tickets they first replied to this day"""
+
+
+class TicketStats(BaseModel):
+    opened: int
+    closed: int
+    medianCloseTime: float | None
+    p95CloseTime: float | None
+    responded: int
+    medianFirstResponse: float | None
+    p95FirstResponse: float | None
+    awaitingResponse: int | None
+    """Open tickets support has not yet replied to, if known"""
+    oldestAwaitingResponse: datetime.datetime | None
+    days: list[TicketDayStats]
+
+
+class EventLoopStats(BaseModel):
+    samples: int
+    """Lag measurements the percentiles are taken over"""
+    p50Lag: float | None
+    """Seconds the event loop ran behind schedule, at the 50th percentile"""
+    p95Lag: float | None
+    p99Lag: float | None
+    maxLag: float | None
+    stalls: int
+    """Times the loop was recently blocked for longer than the configured threshold"""
+    longestStall: float | None
+
+
 # noinspection PyPep8Naming
-def convert_database_guild_to_JSON_model(guild) -> GuildConfig:
-    """Converts a database model of a guild to the response model"""
+def convert_database_guild_to_JSON_model(guild, questions=None) -> GuildConfig:
+    """Converts a database model of a guild, or a GuildSnapshot, to the response model.
+
+    `questions` are TicketQuestion models or QuestionSnapshots, defaulting to the guild's fetched questions (which a
+    GuildSnapshot does not have)."""
+    if questions is None:
+        questions = getattr(guild, "questions", ())
     return GuildConfig(
         entry_id=guild.entry_id,
         id=str(guild.id),
-        ticketCounter=guild.ticketCounter,
-        ticketCategory=guild.ticketCategory,
-        logChannel=guild.logChannel,
-        supportRoles=list(map(str, guild.supportRoles)),
-        pingSupportRoles=guild.pingSupportRoles,
-        maxTickets=guild.maxTickets,
-        supportEnabled=guild.supportEnabled,
-        questions=list(map(lambda d: TicketQuestion(**d), guild.questions)),
+        ticketCounter=guild.ticket_count,
+        ticketCategory=str(guild.ticket_category) if guild.ticket_category is not None else None,
+        logChannel=str(guild.log_channel) if guild.log_channel is not None else None,
+        supportRoles=list(map(str, guild.support_roles)),
+        pingSupportRoles=guild.ping_support_roles,
+        maxTickets=guild.max_tickets,
+        supportEnabled=guild.support_enabled,
+        questions=[
+            TicketQuestion(
+                label=q.label,
+                placeholder=q.placeholder,
+                min_length=q.min_length,
+                max_length=q.max_length,
+                required=q.required,
+            )
+            for q in questions
+        ],
     )
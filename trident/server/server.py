@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import secrets
 from typing import Union
 from urllib.parse import quote_plus as quote
@@ -7,7 +8,9 @@ import discord
 import httpx
 import orm
 from fastapi import Depends, FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, ORJSONResponse, RedirectResponse
+from fastapi.routing import APIRoute, request_response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from trident.cogs.ticket import TicketCog
@@ -15,6 +18,8 @@ from trident.database import APIToken
 from trident.database import Guild as DatabaseGuild
 from trident.database import Ticket as DatabaseTicket
 from trident.database import Token
+from trident.utils.replicas import read_replica
+from trident.utils.rollups import summarise
 
 from . import utils
 from .models import *
@@ -46,6 +51,15 @@ bearer = HTTPBearer()
 app.state.sessions = {}
 
 
+@app.middleware("http")
+async def route_reads_to_replica(request, call_next):
+    """Lets GET requests read from a replica. call_next runs in a new task, which inherits this context."""
+    if request.method in ("GET", "HEAD"):
+        with read_replica():
+            return await call_next(request)
+    return await call_next(request)
+
+
 @app.exception_handler(httpx.HTTPError)
 async def exception_handler(_, exc: httpx.HTTPError):
     return JSONResponse(
@@ -290,6 +304,66 @@ async def get_guild_config(guild_id: int):
     )
 
 
+@app.get("/api/guilds/{guild_id}/stats", response_model=TicketStats)
+async def get_guild_ticket_stats(guild_id: int, days: int = Query(30, ge=1, le=365), user: Token = Depends(get_user)):
+    """Fetches ticket statistics for the last `:days` days. Only reads the daily rollups, not ticket history.
+    Requires the Manage Server permission in the guild."""
+    d_guild: discord.Guild | None = app.state.bot.get_guild(guild_id)
+    if not d_guild:
+        raise HTTPException(404, "Unknown guild ID.")
+    try:
+        member = await d_guild.fetch_member(user.user_id)
+    except discord.NotFound:
+        raise HTTPException(403, "You are not in that server.")
+    if not has_permissions(discord.Permissions(manage_guild=True), member):
+        raise HTTPException(403, "Insufficient permissions.")
+
+    rows, summary = await summarise(guild_id, days)
+    cog = app.state.bot.get_cog("TicketCog")
+    waiting = cog.responses.awaiting_response(guild_id) if cog is not None and cog.responses_enabled else None
+    return TicketStats(
+        opened=summary["opened"],
+        closed=summary["closed"],
+        medianCloseTime=summary["median_close_time"],
+        p95CloseTime=summary["p95_close_time"],
+        responded=summary["responded"],
+        medianFirstResponse=summary["median_first_response"],
+        p95FirstResponse=summary["p95_first_response"],
+        awaitingResponse=len(waiting) if waiting is not None else None,
+        oldestAwaitingResponse=waiting[0].opened_at if waiting else None,
+        days=[
+            TicketDayStats(
+                day=row.day,
+                opened=row.opened,
+                closed=row.closed,
+                medianCloseTime=row.median_close_time,
+                p95CloseTime=row.p95_close_time,
+                responded=row.responded,
+                medianFirstResponse=row.median_first_response,
+            )
+            for row in rows
+        ],
+    )
+
+
+@app.get("/api/stats/loop", dependencies=[Depends(get_account)], response_model=EventLoopStats)
+async def get_event_loop_stats():
+    """Fetches the bot's recent event loop lag, for monitoring to alert on."""
+    monitor = app.state.bot.loop_monitor
+    if monitor is None:
+        raise HTTPException(404, "Event loop monitoring is disabled.")
+    cuts = monitor.percentiles() or {}
+    return EventLoopStats(
+        samples=len(monitor.lags),
+        p50Lag=cuts.get("p50"),
+        p95Lag=cuts.get("p95"),
+        p99Lag=cuts.get("p99"),
+        maxLag=cuts.get("max"),
+        stalls=len(monitor.slow_callbacks),
+        longestStall=max((stall.duration for stall in monitor.slow_callbacks), default=None),
+    )
+
+
 @app.get(
     "/api/guilds/{guild_id}/tickets", response_model=Union[list[Ticket], Ticket], dependencies=[Depends(oauth_ready)]
 )
@@ -382,22 +456,13 @@ async def lock_ticket(guild_id: int, ticket_id: int, body: TicketLockPayload, us
     embed.set_footer(text="Via web dashboard")
     await channel.send(embed=embed)
     await ticket.update(locked=body.locked)
-    if ticket.locked:
-        if channel.permissions_for(d_guild.me).manage_channels:
-            if not channel.name.startswith("\N{LOCK}"):
-                app.state.bot.loop.create_task(
-                    channel.edit(
-                        name="\N{LOCK}-ticket-{}".format(ticket.localID),
-                    ),
-                )
-    else:
-        if channel.permissions_for(d_guild.me).manage_channels:
-            if channel.name.startswith("\N{LOCK}"):
-                app.state.bot.loop.create_task(
-                    channel.edit(
-                        name="ticket-{}".format(ticket.localID),
-                    )
-                )
+    cog: TicketCog | None = app.state.bot.get_cog("TicketCog")
+    # The cog may be mid-reload. The lock itself has been saved by now, so only the rename is skipped.
+    if cog is not None and channel.permissions_for(d_guild.me).manage_channels:
+        if ticket.locked:
+            cog.renames.schedule(channel, "\N{LOCK}-ticket-{}".format(ticket.localID))
+        else:
+            cog.renames.schedule(channel, "ticket-{}".format(ticket.localID))
 
 
 @app.delete("/api/guilds/{guild_id}/tickets/{ticket_id}")
@@ -437,6 +502,22 @@ async def delete_ticket(guild_id: int, ticket_id: int, reason: str = Query(None)
     return JSONResponse({"status": "meh"})
 
 
+def use_orjson_responses() -> bool:
+    """Switches every route that uses the default response class over to ORJSONResponse, if orjson is installed.
+
+    FastAPI resolves a route's response class when the route is registered, so each route's handler is rebuilt."""
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return False
+    for route in app.routes:
+        if isinstance(route, APIRoute) and isinstance(route.response_class, DefaultPlaceholder):
+            route.response_class = DefaultPlaceholder(ORJSONResponse)
+            route.app = request_response(route.get_route_handler())
+    app.router.default_response_class = DefaultPlaceholder(ORJSONResponse)
+    return True
+
+
 def run(bot) -> app:
     app.state.bot = bot
     app.state.all_config = bot.config
@@ -448,4 +529,7 @@ def run(bot) -> app:
         task.add_done_callback(lambda _: setattr(app.state, "client_id", str(bot.user.id)))
     app.state.client_secret = app.state.config.get("client_secret")
     app.state.redirect_uri = app.state.config.get("redirect_uri")
+    if bot.config["trident"]["runtime"].get("orjson", False):
+        if not use_orjson_responses():
+            logging.getLogger("trident.runtime").warning("orjson is enabled in config.toml, but is not installed.")
     return app
@@ -0,0 +1,46 @@
+"""Short-lived caching of autocomplete results, as Discord sends an autocomplete interaction for every keystroke."""
+
+from typing import Awaitable, Callable
+
+from .resolver import TTLCache
+
+__all__ = ("CompletionCache",)
+
+
+class CompletionCache:
+    """Caches per-guild `name contains <query>` completions.
+
+    As anything containing "abc" also contains "ab", a query that extends one already answered in full (i.e. with
+    fewer than `limit` results) is answered by filtering the earlier results, rather than by querying again. Call
+    `invalidate` whenever the set of names changes."""
+
+    def __init__(self, ttl: float = 10, max_size: int = 1024, limit: int = 25):
+        self.limit = limit
+        self._results = TTLCache(ttl, max_size)
+        # Bumped by invalidate(), orphaning every cached result for the guild.
+        self._generations: dict[int, int] = {}
+
+    async def get(self, guild_id: int, query: str, fetch: Callable[[], Awaitable[list[str]]]) -> list[str]:
+        generation = self._generations.get(guild_id, 0)
+        cached = self._results.get((guild_id, generation, query))
+        if cached is not None:
+            return cached[0]
+
+        for end in range(len(query) - 1, -1, -1):
+            superset = self._results.get((guild_id, generation, query[:end]))
+            if superset is not None:
+                names, complete = superset
+                if complete:
+                    names = [name for name in names if query in name]
+                    self._results.set((guild_id, generation, query), (names, True))
+                    return names
+                break
+
+        names = await fetch()
+        # Only cache if nothing was written while we were fetching.
+        if self._generations.get(guild_id, 0) == generation:
+            self._results.set((guild_id, generation, query), (names, len(names) < self.limit))
+        return names
+
+    def invalidate(self, guild_id: int) -> None:
+        self._generations[guild_id] = self._generations.get(guild_id, 0) + 1
@@ -0,0 +1,104 @@
+"""Placement of new tickets across a guild's pool of ticket categories.
+
+A guild's pool is its ticket category followed by its overflow categories, in order. Each pool tracks which channels
+are in each of its categories, kept up to date from channel events rather than by counting `category.channels` for
+every new ticket, and files its categories into buckets by channel count. As Discord caps categories at 50 channels,
+finding the least-loaded category is a scan of at most 51 buckets, however many categories the pool has."""
+
+from typing import Iterable
+
+import discord
+
+__all__ = ("CATEGORY_LIMIT", "CategoryPool", "CategoryPoolCache")
+
+CATEGORY_LIMIT = 50
+
+
+class CategoryPool:
+    __slots__ = ("source", "order", "channels", "buckets", "total")
+
+    def __init__(self, guild: discord.Guild, category_ids: Iterable[int]):
+        self.source = tuple(dict.fromkeys(category_ids))
+        self.order: dict[int, int] = {}
+        self.channels: dict[int, set[int]] = {}
+        self.buckets: list[set[int]] = [set() for _ in range(CATEGORY_LIMIT + 1)]
+        self.total = 0
+        for category_id in self.source:
+            category = guild.get_channel(category_id)
+            if isinstance(category, discord.CategoryChannel):
+                self.add_category(category)
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self.channels
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def count(self, category_id: int) -> int:
+        return len(self.channels[category_id])
+
+    def _move(self, category_id: int, before: int, after: int) -> None:
+        self.buckets[min(before, CATEGORY_LIMIT)].discard(category_id)
+        self.buckets[min(after, CATEGORY_LIMIT)].add(category_id)
+        self.total += after - before
+
+    def add_category(self, category: discord.CategoryChannel) -> None:
+        if category.id in self.channels:
+            return
+        self.order.setdefault(category.id, len(self.order))
+        self.channels[category.id] = {channel.id for channel in category.channels}
+        self.buckets[min(len(self.channels[category.id]), CATEGORY_LIMIT)].add(category.id)
+        self.total += len(self.channels[category.id])
+
+    def remove_category(self, category_id: int) -> None:
+        channels = self.channels.pop(category_id, None)
+        if channels is not None:
+            self.buckets[min(len(channels), CATEGORY_LIMIT)].discard(category_id)
+            self.total -= len(channels)
+
+    def add_channel(self, category_id: int | None, channel_id: int) -> None:
+        """Records a channel as being in a category. Safe to call more than once for the same channel, e.g. once when
+        it is created and again when the gateway tells us about it."""
+        channels = self.channels.get(category_id)
+        if channels is not None and channel_id not in channels:
+            channels.add(channel_id)
+            self._move(category_id, len(channels) - 1, len(channels))
+
+    def remove_channel(self, category_id: int | None, channel_id: int) -> None:
+        channels = self.channels.get(category_id)
+        if channels is not None and channel_id in channels:
+            channels.discard(channel_id)
+            self._move(category_id, len(channels) + 1, len(channels))
+
+    def least_loaded(self, limit: int = CATEGORY_LIMIT) -> int | None:
+        """Returns the ID of the category with the fewest channels (the earliest in the pool, on a tie), or None if
+        every category has `limit` (at most CATEGORY_LIMIT) channels or more."""
+        for bucket in self.buckets[: min(limit, CATEGORY_LIMIT)]:
+            if bucket:
+                return min(bucket, key=self.order.__getitem__)
+
+
+class CategoryPoolCache:
+    """Per-guild cache of CategoryPools, rebuilt whenever the categories they were built from no longer match the config
+    they are looked up with."""
+
+    def __init__(self):
+        self._pools: dict[int, CategoryPool] = {}
+
+    @staticmethod
+    def category_ids(config) -> tuple[int, ...]:
+        ids = [config.ticket_category] if config.ticket_category else []
+        return tuple(dict.fromkeys(ids + list(config.overflow_categories)))
+
+    def get(self, guild: discord.Guild, config) -> CategoryPool:
+        pool = self._pools.get(guild.id)
+        if pool is None or pool.source != self.category_ids(config):
+            pool = self._pools[guild.id] = CategoryPool(guild, self.category_ids(config))
+        return pool
+
+    def cached(self, guild_id: int) -> CategoryPool | None:
+        """Returns a guild's pool if one has already been built, without needing its config."""
+        return self._pools.get(guild_id)
+
+    def invalidate(self, guild_id: int) -> None:
+        self._pools.pop(guild_id, None)
@@ -0,0 +1,115 @@
+"""Persistent, stateless ticket control components.
+
+Rather than keeping a View alive for every ticket, the controls carry everything needed to handle them in their
+custom_id (`trident:ticket:<action>`, acting on the ticket whose channel they are in), and are routed by a single
+`on_interaction` listener in TicketCog. They keep working across restarts, and cost no memory however many tickets are
+open.
+
+The questions form shown by `/ticket new` works the same way: its custom_id
+(`trident:questions:<guild ID>:<question set version>`) is all that's needed to carry on creating the ticket once it
+is submitted, so nothing waits around for forms that never are."""
+
+import discord
+
+__all__ = (
+    "CONTROL_PREFIX",
+    "CLOSE",
+    "LOCK",
+    "ADD_MEMBER",
+    "control_id",
+    "parse_control_id",
+    "questions_id",
+    "parse_questions_id",
+    "modal_values",
+    "ticket_controls",
+    "send_with_controls",
+    "AddMemberModal",
+)
+
+CONTROL_PREFIX = "trident:ticket:"
+CLOSE = "close"
+LOCK = "lock"
+ADD_MEMBER = "add-member"
+QUESTIONS_PREFIX = "trident:questions:"
+
+
+def control_id(action: str) -> str:
+    return CONTROL_PREFIX + action
+
+
+def parse_control_id(custom_id: str | None) -> str | None:
+    """Returns the action a ticket control's custom_id is for, or None if it isn't a ticket control."""
+    if custom_id and custom_id.startswith(CONTROL_PREFIX):
+        return custom_id[len(CONTROL_PREFIX) :]
+
+
+def questions_id(guild_id: int, version: str) -> str:
+    return f"{QUESTIONS_PREFIX}{guild_id}:{version}"
+
+
+def parse_questions_id(custom_id: str | None) -> tuple[int, str] | None:
+    """Returns the guild ID and question set version a questions form's custom_id is for, or None if it isn't one."""
+    if not custom_id or not custom_id.startswith(QUESTIONS_PREFIX):
+        return None
+    guild_id, _, version = custom_id[len(QUESTIONS_PREFIX) :].partition(":")
+    if not guild_id.isdigit():
+        return None
+    return int(guild_id), version
+
+
+def modal_values(interaction: discord.Interaction) -> dict[str, str]:
+    """Returns a submitted modal's values by input custom_id, straight from the interaction payload."""
+    return {
+        component["custom_id"]: component.get("value") or ""
+        for row in interaction.data.get("components", [])
+        for component in row.get("components", [])
+    }
+
+
+def ticket_controls() -> discord.ui.View:
+    """Builds the controls for a ticket's intro message. Send them with `send_with_controls`.
+
+    The View is only a vehicle for the components: it has no callbacks, and is stopped so nothing dispatches to it."""
+    view = discord.ui.View(timeout=None)
+    view.add_item(
+        discord.ui.Button(
+            label="Close", emoji="\N{WASTEBASKET}", style=discord.ButtonStyle.red, custom_id=control_id(CLOSE)
+        )
+    )
+    view.add_item(
+        discord.ui.Button(label="Lock", emoji="\N{LOCK}", style=discord.ButtonStyle.grey, custom_id=control_id(LOCK))
+    )
+    view.add_item(
+        discord.ui.Button(
+            label="Add member", emoji="\N{INBOX TRAY}", style=discord.ButtonStyle.grey, custom_id=control_id(ADD_MEMBER)
+        )
+    )
+    view.stop()
+    return view
+
+
+async def send_with_controls(channel: discord.abc.Messageable, *args, **kwargs) -> discord.Message:
+    """Sends a message with the ticket controls.
+
+    Sending a View always stores it against the message, to be kept in sync with edits, and it is only let go of when
+    the message is edited - never when the channel is deleted. So it is untracked straight away, rather than one View
+    being kept per ticket for the life of the process."""
+    message = await channel.send(*args, view=ticket_controls(), **kwargs)
+    message._state.prevent_view_updates_for(message.id)
+    return message
+
+
+class AddMemberModal(discord.ui.Modal):
+    """Asks who to add to a ticket. Submissions are handled by TicketCog's `on_interaction` listener."""
+
+    def __init__(self):
+        super().__init__(
+            discord.ui.InputText(
+                label="Members and/or roles",
+                placeholder="Mentions or IDs, separated by spaces.",
+                custom_id="targets",
+                max_length=1000,
+            ),
+            title="Add to ticket",
+            custom_id=control_id(ADD_MEMBER),
+        )
@@ -0,0 +1,191 @@
+"""Closes tickets that have gone quiet.
+
+Each tracked ticket's last activity is kept in memory, updated from message events, and written back to the database
+in batches rather than on every message. Deadlines sit in a heap that is never touched on activity: recording
+activity is a single dict write, and a deadline that turns out to be stale when it comes due is simply pushed back
+for the ticket's new deadline. Configured via `[trident.inactivity]`:
+
+    [trident.inactivity]
+    tick = 30            # seconds between checks for due warnings and closes
+    flush_interval = 30  # seconds between writes of last activity to the database
+
+Each guild chooses how long a ticket may be inactive for with `/settings auto-close`. A warning is posted in the
+ticket a quarter of that period (at most a day) before it is closed."""
+
+import asyncio
+import datetime
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable
+
+from tortoise import connections
+
+__all__ = ("TicketTimer", "InactivityTracker", "warning_period")
+
+log = logging.getLogger("trident.inactivity")
+
+# Seconds to wait before trying again if a warning or close fails.
+RETRY_AFTER = 300
+
+
+def warning_period(timeout: float) -> float:
+    """How long before a ticket is closed for inactivity it is warned about it."""
+    return min(timeout / 4, 86400.0)
+
+
+class TicketTimer:
+    __slots__ = ("channel_id", "guild_id", "last_activity", "timeout", "warned")
+
+    def __init__(self, channel_id: int, guild_id: int, last_activity: float, timeout: float, warned: bool = False):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.last_activity = last_activity
+        self.timeout = timeout
+        self.warned = warned
+
+    @property
+    def deadline(self) -> float:
+        """When the next warning or close is due."""
+        if self.warned:
+            return self.last_activity + self.timeout
+        return self.last_activity + self.timeout - warning_period(self.timeout)
+
+    @property
+    def closes_at(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.last_activity + self.timeout, datetime.timezone.utc)
+
+
+class InactivityTracker:
+    def __init__(
+        self,
+        on_warn: Callable[[TicketTimer], Awaitable],
+        on_close: Callable[[TicketTimer], Awaitable],
+        *,
+        tick: float = 30.0,
+        flush_interval: float = 30.0,
+    ):
+        self.on_warn = on_warn
+        self.on_close = on_close
+        self.tick = tick
+        self.flush_interval = flush_interval
+        self.timers: dict[int, TicketTimer] = {}
+        self._heap: list[tuple[float, int]] = []
+        self._dirty: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self.timers
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def close(self) -> None:
+        """Stops the background flushes, then writes out anything not yet saved."""
+        self.stop()
+        await self.flush()
+
+    # Tracking
+
+    def track(
+        self,
+        channel_id: int,
+        guild_id: int,
+        last_activity: datetime.datetime,
+        timeout: float,
+        warned: bool = False,
+    ) -> None:
+        timer = self.timers[channel_id] = TicketTimer(channel_id, guild_id, last_activity.timestamp(), timeout, warned)
+        heapq.heappush(self._heap, (timer.deadline, channel_id))
+
+    def untrack(self, channel_id: int) -> None:
+        # Its heap entry is dropped when it comes due.
+        self.timers.pop(channel_id, None)
+        self._dirty.discard(channel_id)
+
+    def untrack_guild(self, guild_id: int) -> None:
+        for channel_id in [c for c, timer in self.timers.items() if timer.guild_id == guild_id]:
+            self.untrack(channel_id)
+
+    def touch(self, channel_id: int, when: datetime.datetime) -> None:
+        """Records activity in a ticket. O(1): its deadline is only moved once the old one comes due."""
+        timer = self.timers.get(channel_id)
+        if timer is not None:
+            timer.last_activity = max(timer.last_activity, when.timestamp())
+            timer.warned = False
+            self._dirty.add(channel_id)
+
+    def due(self, now: float | None = None) -> list[TicketTimer]:
+        """Pops every timer whose warning or close is due."""
+        now = time.time() if now is None else now
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            deadline, channel_id = heapq.heappop(self._heap)
+            timer = self.timers.get(channel_id)
+            if timer is None or channel_id in due:
+                continue
+            if timer.deadline > now:
+                # There has been activity since this was scheduled.
+                heapq.heappush(self._heap, (timer.deadline, channel_id))
+                continue
+            due[channel_id] = timer
+        return list(due.values())
+
+    def reschedule(self, timer: TicketTimer) -> None:
+        """Schedules a timer's next deadline, e.g. after being warned."""
+        if timer.channel_id in self.timers:
+            heapq.heappush(self._heap, (timer.deadline, timer.channel_id))
+
+    # Persistence
+
+    async def flush(self) -> int:
+        """Writes the last activity and warning state of every ticket changed since the last flush, in one query."""
+        dirty = [self.timers[c] for c in self._dirty if c in self.timers]
+        self._dirty.clear()
+        if not dirty:
+            return 0
+        try:
+            await connections.get("default").execute_query(
+                "UPDATE tickets AS t SET last_activity = v.last_activity, inactivity_warned = v.warned "
+                "FROM (SELECT unnest($1::bigint[]) AS channel, unnest($2::timestamptz[]) AS last_activity, "
+                "unnest($3::bool[]) AS warned) AS v WHERE t.channel = v.channel",
+                [
+                    [timer.channel_id for timer in dirty],
+                    [datetime.datetime.fromtimestamp(timer.last_activity, datetime.timezone.utc) for timer in dirty],
+                    [timer.warned for timer in dirty],
+                ],
+            )
+        except Exception:
+            # Try again next time.
+            self._dirty.update(timer.channel_id for timer in dirty)
+            raise
+        return len(dirty)
+
+    def mark_dirty(self, channel_id: int) -> None:
+        self._dirty.add(channel_id)
+
+    async def run(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick)
+            for timer in self.due():
+                try:
+                    if timer.warned:
+                        await self.on_close(timer)
+                    else:
+                        await self.on_warn(timer)
+                except Exception as e:
+                    log.error("Failed to handle inactivity in %s: %s", timer.channel_id, e, exc_info=e)
+                    heapq.heappush(self._heap, (time.time() + RETRY_AFTER, timer.channel_id))
+            if time.monotonic() - last_flush >= self.flush_interval:
+                last_flush = time.monotonic()
+                try:
+                    await self.flush()
+                except Exception as e:
+                    log.error("Failed to save ticket activity: %s", e, exc_info=e)
@@ -0,0 +1,139 @@
+"""Logging that never blocks the event loop.
+
+Records are put on an in-memory queue by whichever thread logs them, and written out (to stderr) by a background
+listener thread, so a slow terminal or a burst of logging cannot stall the loop. Configured via `[trident.logging]`:
+
+    [trident.logging]
+    level = "INFO"     # root level. Defaults to `[trident] log_level`, then INFO.
+    json = false       # one JSON object per line, instead of plain text
+    levels = { "discord.gateway" = "WARNING", "trident.loop" = "DEBUG" }  # per-logger levels
+
+Records logged while handling an interaction carry its ID, guild ID and command (or component ID), as
+`interaction_id`, `guild_id` and `command` - as JSON fields, or for use in a plain text `format`."""
+
+import atexit
+import datetime
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar, Token
+from logging.handlers import QueueHandler, QueueListener
+
+__all__ = ("CONTEXT_FIELDS", "bind", "unbind", "interaction_context", "JSONFormatter", "setup_logging")
+
+CONTEXT_FIELDS = ("interaction_id", "guild_id", "command")
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s: %(message)s"
+TEXT_DATEFMT = "%Y-%m-%d"
+
+_context: ContextVar[dict] = ContextVar("trident_log_context", default={})
+_listener: QueueListener | None = None
+
+
+def bind(**fields) -> Token:
+    """Adds fields to every record logged from the current context (and tasks created from it)."""
+    return _context.set({**_context.get(), **fields})
+
+
+def unbind(token: Token) -> None:
+    _context.reset(token)
+
+
+def interaction_context(interaction) -> dict:
+    """The context fields for a discord.Interaction."""
+    data = interaction.data or {}
+    return {
+        "interaction_id": interaction.id,
+        "guild_id": interaction.guild_id,
+        "command": data.get("name") or data.get("custom_id"),
+    }
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current context's fields onto each record. Must run in the logging thread, not the listener."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        for field in CONTEXT_FIELDS:
+            setattr(record, field, context.get(field))
+        return True
+
+
+class NonBlockingHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, this keeps the message and traceback apart, so the listener's formatter can
+        # still lay them out (or put them in separate JSON fields). Anything unpicklable or mutable is resolved now.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        # Writes out anything still queued.
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logging(config: dict) -> QueueListener:
+    """Replaces the root logger's handlers with a queue, and starts the listener thread that drains it.
+
+    Safe to call again (e.g. in a forked cluster process): the previous queue and listener are replaced."""
+    global _listener
+    trident = config.get("trident", {})
+    log_config = trident.get("logging", {})
+
+    output = logging.StreamHandler(sys.stderr)
+    if log_config.get("json", False):
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(
+            logging.Formatter(log_config.get("format", TEXT_FORMAT), log_config.get("datefmt", TEXT_DATEFMT))
+        )
+
+    records = queue.SimpleQueue()
+    handler = NonBlockingHandler(records)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(handler)
+    root.setLevel(log_config.get("level", trident.get("log_level", "INFO")).upper())
+    for name, level in log_config.get("levels", {}).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _stop_listener()
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
@@ -0,0 +1,108 @@
+import asyncio
+import collections
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+
+__all__ = ("SlowCallback", "LoopMonitor")
+
+
+class SlowCallback:
+    """A record of the event loop being blocked, along with where it was blocked."""
+
+    __slots__ = ("started_at", "duration", "stack")
+
+    def __init__(self, started_at: float, duration: float, stack: str):
+        self.started_at = started_at
+        self.duration = duration
+        self.stack = stack
+
+
+class LoopMonitor:
+    """Measures event loop scheduling lag, and catches whatever is blocking the loop while it is blocked.
+
+    A task on the loop wakes up every `interval` seconds and records how late it woke up. Meanwhile, a watchdog
+    thread checks that task's heartbeat; if the loop has not run it for longer than `threshold` seconds past when it
+    should have, the watchdog grabs the loop thread's current stack (which is, by definition, the code blocking it).
+    Once the loop recovers, the stall is logged with that stack and its total duration. Lag percentiles and stalls
+    are also served by the dashboard API, at `/api/stats/loop`, for monitoring to alert on."""
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.5,
+        threshold: float = 0.25,
+        report_interval: float = 300.0,
+        size: int = 1200,
+        history: int = 50,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.lags: collections.deque[float] = collections.deque(maxlen=size)
+        self.slow_callbacks: collections.deque[SlowCallback] = collections.deque(maxlen=history)
+        self.log = logging.getLogger("trident.loop")
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._next_beat = 0.0
+        self._stall_stack: str | None = None
+        self._last_report = time.monotonic()
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._next_beat = time.monotonic() + self.interval
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="trident-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def percentiles(self) -> dict[str, float] | None:
+        """Returns the p50, p95 and p99 lag (in seconds) over the buffered measurements."""
+        if len(self.lags) < 2:
+            return None
+        cuts = statistics.quantiles(self.lags, n=100, method="inclusive")
+        return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(self.lags)}
+
+    async def _measure(self) -> None:
+        while True:
+            self._next_beat = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - self._next_beat)
+            self.lags.append(lag)
+
+            stack, self._stall_stack = self._stall_stack, None
+            if stack is not None:
+                self.slow_callbacks.append(SlowCallback(self._next_beat, lag, stack))
+                self.log.warning("Event loop was blocked for %.3f seconds at:\n%s", lag, stack)
+
+            if now - self._last_report >= self.report_interval:
+                self._last_report = now
+                cuts = self.percentiles()
+                if cuts is not None:
+                    self.log.info(
+                        "Event loop lag: p50 %.1fms, p95 %.1fms, p99 %.1fms, max %.1fms",
+                        *(cuts[key] * 1000 for key in ("p50", "p95", "p99", "max")),
+                    )
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.threshold / 2):
+            if self._stall_stack is not None:
+                continue
+            if time.monotonic() - self._next_beat > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._stall_stack = "".join(traceback.format_stack(frame))
@@ -0,0 +1,164 @@
+"""A Tortoise engine wrapping asyncpg, whose connection pool is configurable and records acquisition statistics.
+
+Used as the `engine` for the default connection (see `build_database_config`), and configured via `[database.pool]`:
+
+    [database.pool]
+    min_size = 1
+    max_size = 10
+    max_queries = 50000                    # queries before a connection is replaced
+    max_inactive_connection_lifetime = 300 # seconds an idle connection is kept for
+    statement_cache_size = 100             # prepared statements cached per connection (0 disables, e.g. for PgBouncer)
+    command_timeout = 30                   # default per-query timeout, in seconds
+"""
+
+import collections
+import statistics
+import time
+
+import asyncpg
+from tortoise import connections
+from tortoise.backends.asyncpg import AsyncpgDBClient
+from tortoise.backends.base.config_generator import expand_db_url
+from tortoise.exceptions import ConfigurationError
+
+__all__ = (
+    "PoolStats",
+    "InstrumentedAcquire",
+    "InstrumentedPool",
+    "InstrumentedAsyncpgDBClient",
+    "build_database_config",
+    "build_connections",
+    "get_pool_stats",
+)
+
+# [database.pool] key -> Tortoise credential key
+POOL_OPTIONS = {
+    "min_size": "minsize",
+    "max_size": "maxsize",
+    "max_queries": "max_queries",
+    "max_inactive_connection_lifetime": "max_inactive_connection_lifetime",
+    "statement_cache_size": "statement_cache_size",
+    "command_timeout": "command_timeout",
+}
+
+
+class PoolStats:
+    """Live statistics for an InstrumentedPool."""
+
+    __slots__ = ("pool", "waiting", "acquired", "timeouts", "latencies")
+
+    def __init__(self, pool: "InstrumentedPool", size: int = 1000):
+        self.pool = pool
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.latencies: collections.deque[float] = collections.deque(maxlen=size)
+
+    @property
+    def size(self) -> int:
+        return self.pool.get_size()
+
+    @property
+    def in_use(self) -> int:
+        return self.pool.get_size() - self.pool.get_idle_size()
+
+    def latency_percentiles(self) -> dict[str, float] | None:
+        """Returns the p50, p95 and max time (in seconds) spent waiting to acquire a connection, recently."""
+        if len(self.latencies) < 2:
+            return None
+        cuts = statistics.quantiles(self.latencies, n=20, method="inclusive")
+        return {"p50": cuts[9], "p95": cuts[18], "max": max(self.latencies)}
+
+
+class InstrumentedAcquire:
+    """What InstrumentedPool.acquire() returns: like asyncpg's, it can be awaited or used with `async with`."""
+
+    __slots__ = ("pool", "timeout", "connection")
+
+    def __init__(self, pool: "InstrumentedPool", timeout: float | None):
+        self.pool = pool
+        self.timeout = timeout
+        self.connection = None
+
+    async def _acquire(self) -> asyncpg.Connection:
+        stats = self.pool.stats
+        stats.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = await self.pool.pool.acquire(timeout=self.timeout)
+        except TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.waiting -= 1
+        stats.latencies.append(time.perf_counter() - start)
+        stats.acquired += 1
+        return connection
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self.connection = await self._acquire()
+        return self.connection
+
+    async def __aexit__(self, *exc_info) -> None:
+        connection, self.connection = self.connection, None
+        await self.pool.release(connection)
+
+
+class InstrumentedPool:
+    """Wraps an asyncpg.Pool, timing each acquire(). Only the pool's public API is used; everything else is passed
+    straight through to it."""
+
+    __slots__ = ("pool", "stats")
+
+    def __init__(self, pool: asyncpg.Pool):
+        self.pool = pool
+        self.stats = PoolStats(self)
+
+    def acquire(self, *, timeout: float | None = None) -> InstrumentedAcquire:
+        return InstrumentedAcquire(self, timeout)
+
+    async def release(self, connection: asyncpg.Connection, *, timeout: float | None = None) -> None:
+        await self.pool.release(connection, timeout=timeout)
+
+    def __getattr__(self, name: str):
+        return getattr(self.pool, name)
+
+
+class InstrumentedAsyncpgDBClient(AsyncpgDBClient):
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        return InstrumentedPool(await super().create_pool(**kwargs))
+
+
+client_class = InstrumentedAsyncpgDBClient
+
+
+def build_database_config(config: dict, url: str | None = None) -> dict:
+    """Builds the Tortoise connection config for `[database]` (or another URL), applying `[database.pool]` options."""
+    connection = expand_db_url(url or config["database"]["url"])
+    connection["engine"] = __name__
+    for key, value in config["database"].get("pool", {}).items():
+        if key not in POOL_OPTIONS:
+            raise ValueError("Unknown [database.pool] option: %r" % key)
+        connection["credentials"][POOL_OPTIONS[key]] = value
+    return connection
+
+
+def build_connections(config: dict) -> dict[str, dict]:
+    """Builds every Tortoise connection: "default" for the primary, plus "replica_N" for each `[database] replicas`."""
+    result = {"default": build_database_config(config)}
+    for number, url in enumerate(config["database"].get("replicas", [])):
+        result["replica_%d" % number] = build_database_config(config, url)
+    return result
+
+
+def get_pool_stats(connection_name: str = "default") -> PoolStats | None:
+    """Returns the statistics of a connection's pool, if it is an InstrumentedPool that has been created."""
+    try:
+        connection = connections.get(connection_name)
+    except ConfigurationError:
+        return None
+    pool = getattr(connection, "_pool", None)
+    return getattr(pool, "stats", None)
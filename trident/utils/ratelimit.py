@@ -0,0 +1,94 @@
+"""In-memory admission control for ticket creation.
+
+Each guild gets a token bucket: `burst` tickets can be opened at once, after which tickets are admitted at
+`per_minute`. A request arriving while the bucket is empty is turned away straight away with how long to wait, rather
+than being held: it still has to be answered within Discord's 3 second deadline, and sending the questions form has
+to be its first response, so it cannot be deferred while it waits. Defaults are configured via
+`[trident.ticket_rate_limit]`:
+
+    [trident.ticket_rate_limit]
+    per_minute = 10
+    burst = 10
+
+and can be overridden per guild with `/settings ticket-rate-limit`."""
+
+import time
+
+__all__ = ("TokenBucket", "TicketAdmission")
+
+
+class TokenBucket:
+    """A classic token bucket: `capacity` tokens, refilled at `rate` tokens per second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def level(self) -> float:
+        """How many tokens are currently available, from 0 up to `capacity`."""
+        self._refill()
+        return self.tokens
+
+    def acquire(self) -> bool:
+        """Takes a token, if one is available right now."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def reconfigure(self, rate: float, capacity: int) -> None:
+        self._refill()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+
+class TicketAdmission:
+    """Per-guild token buckets guarding ticket creation, entirely in memory so that excess requests can be turned
+    away before they cost any database queries or API calls."""
+
+    def __init__(self, config: dict):
+        self.default_per_minute: float = config.get("per_minute", 10)
+        self.default_burst: int = config.get("burst", 10)
+        self._buckets: dict[int, TokenBucket] = {}
+        self._overrides: dict[int, tuple[float, int]] = {}
+
+    def limits(self, guild_id: int) -> tuple[float, int]:
+        """Returns (tickets per minute, burst) for a guild."""
+        return self._overrides.get(guild_id, (self.default_per_minute, self.default_burst))
+
+    def bucket(self, guild_id: int) -> TokenBucket:
+        bucket = self._buckets.get(guild_id)
+        if bucket is None:
+            per_minute, burst = self.limits(guild_id)
+            bucket = self._buckets[guild_id] = TokenBucket(per_minute / 60, burst)
+        return bucket
+
+    def configure(self, guild_id: int, per_minute: float | None, burst: int | None) -> None:
+        """Sets (or with None, clears) a guild's own limits."""
+        if per_minute is None and burst is None:
+            self._overrides.pop(guild_id, None)
+        else:
+            self._overrides[guild_id] = (per_minute or self.default_per_minute, burst or self.default_burst)
+        if guild_id in self._buckets:
+            per_minute, burst = self.limits(guild_id)
+            self._buckets[guild_id].reconfigure(per_minute / 60, burst)
+
+    def acquire(self, guild_id: int) -> bool:
+        """Takes a token for a new ticket, if one is available right now."""
+        return self.bucket(guild_id).acquire()
@@ -0,0 +1,94 @@
+import asyncio
+import collections
+import logging
+import time
+
+import discord
+
+__all__ = ("ChannelRenameScheduler",)
+
+
+class ChannelRenameScheduler:
+    """Coalesces channel renames so that only the most recently requested name is ever sent to Discord.
+
+    Discord only allows two renames per channel every ten minutes. Rather than firing an edit per request (and
+    having the library sit on a 429 for up to ten minutes), each channel gets at most one worker which waits for
+    the debounce delay, then for a free slot in the channel's bucket, and finally applies whatever name is
+    wanted *at that point*. Names requested in the meantime replace the pending one, and a rename to the name the
+    channel already has is dropped entirely."""
+
+    def __init__(self, *, rate: int = 2, per: float = 600.0, debounce: float = 2.0):
+        self.rate = rate
+        self.per = per
+        self.debounce = debounce
+        self.log = logging.getLogger("trident.renames")
+        self._pending: dict[int, tuple[discord.abc.GuildChannel, str, str | None]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._history: dict[int, collections.deque[float]] = {}
+        self.superseded = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of channels that currently have a rename waiting to be applied."""
+        return len(self._pending)
+
+    def schedule(self, channel: discord.abc.GuildChannel, name: str, *, reason: str | None = None) -> None:
+        """Requests that `channel` be renamed to `name`, replacing any rename that has not been applied yet."""
+        if channel.id in self._pending:
+            self.superseded += 1
+        self._pending[channel.id] = (channel, name, reason)
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._workers[channel.id] = asyncio.create_task(self._worker(channel.id))
+
+    def retry_after(self, channel_id: int) -> float:
+        """How many seconds until the channel's bucket has a free slot (0 if one is free now)."""
+        history = self._history.get(channel_id)
+        if not history:
+            return 0.0
+        now = time.monotonic()
+        while history and now - history[0] >= self.per:
+            history.popleft()
+        if len(history) < self.rate:
+            return 0.0
+        return self.per - (now - history[0])
+
+    async def _worker(self, channel_id: int) -> None:
+        try:
+            await asyncio.sleep(self.debounce)
+            while channel_id in self._pending:
+                delay = self.retry_after(channel_id)
+                if delay > 0:
+                    self.log.debug("Channel %d rename bucket exhausted, waiting %.1f seconds.", channel_id, delay)
+                    await asyncio.sleep(delay)
+                    continue
+
+                channel, name, reason = self._pending.pop(channel_id)
+                if channel.name == name:
+                    continue
+                self._history.setdefault(channel_id, collections.deque()).append(time.monotonic())
+                try:
+                    await channel.edit(name=name, reason=reason)
+                except discord.NotFound:
+                    self._pending.pop(channel_id, None)
+                except discord.HTTPException as e:
+                    self.log.warning("Failed to rename channel %d to %r: %s", channel_id, name, e)
+        finally:
+            if self._workers.get(channel_id) is asyncio.current_task():
+                del self._workers[channel_id]
+            if self.retry_after(channel_id) == 0 and not self._history.get(channel_id):
+                self._history.pop(channel_id, None)
+
+    def cancel(self, channel_id: int) -> None:
+        """Drops any pending rename for a channel, e.g. because it was deleted."""
+        self._pending.pop(channel_id, None)
+        worker = self._workers.pop(channel_id, None)
+        if worker is not None:
+            worker.cancel()
+        self._history.pop(channel_id, None)
+
+    def close(self) -> None:
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._pending.clear()
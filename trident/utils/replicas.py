@@ -0,0 +1,51 @@
+"""Routes opted-in read queries to read replicas.
+
+Replicas are configured as a list of database URLs:
+
+    [database]
+    url = "postgres://primary/trident"
+    replicas = ["postgres://replica-1/trident", "postgres://replica-2/trident"]
+
+Reads only go to a replica inside a `read_replica()` block, so that paths which can tolerate replication lag have to
+opt in. Any write marks the current task (i.e. the current interaction) as having written, after which all of its
+reads go to the primary, so a user always reads their own writes."""
+
+import contextlib
+import contextvars
+import itertools
+
+__all__ = ("ReplicaRouter", "read_replica")
+
+_prefer_replica: contextvars.ContextVar[bool] = contextvars.ContextVar("prefer_replica", default=False)
+_has_written: contextvars.ContextVar[bool] = contextvars.ContextVar("has_written", default=False)
+
+
+@contextlib.contextmanager
+def read_replica():
+    """Sends reads made inside this block to a replica, unless this task has already written something."""
+    token = _prefer_replica.set(True)
+    try:
+        yield
+    finally:
+        _prefer_replica.reset(token)
+
+
+class ReplicaRouter:
+    """A Tortoise router. Returning None from either method falls back to the model's default connection."""
+
+    replicas: tuple[str, ...] = ()
+    _cycle = None
+
+    @classmethod
+    def configure(cls, replicas: list[str]) -> None:
+        cls.replicas = tuple(replicas)
+        cls._cycle = itertools.cycle(cls.replicas) if cls.replicas else None
+
+    def db_for_read(self, model) -> str | None:
+        if self._cycle is None or not _prefer_replica.get() or _has_written.get():
+            return None
+        return next(self._cycle)
+
+    def db_for_write(self, model) -> None:
+        _has_written.set(True)
+        return None
@@ -0,0 +1,144 @@
+"""Bot-wide lookups of users, and of whether they are in a guild, for when they may not be in the gateway cache.
+
+Results are kept in TTL + LRU caches, concurrent lookups of the same thing share a single request, and `users()`
+looks several users up in parallel. Configured via `[trident.cache]`:
+
+    [trident.cache]
+    resolver_ttl = 300        # seconds a looked-up user is trusted for
+    resolver_member_ttl = 300 # seconds a looked-up membership is trusted for. Defaults to resolver_ttl, or to at most
+                              # 30 without the members intent.
+    resolver_size = 10000     # users (and, separately, memberships) kept
+
+Membership results are invalidated by member join and leave events (see `Bot.on_member_join`). Those need the
+`members` intent, which is off by default; without it, a membership result is only corrected once it expires, hence
+the shorter default TTL."""
+
+import asyncio
+import collections
+import time
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+import discord
+
+__all__ = ("TTLCache", "UserResolver")
+
+T = TypeVar("T")
+_MISSING = object()
+
+
+class TTLCache:
+    """A size-bounded mapping whose entries expire `ttl` seconds after being set, evicting the least recently used."""
+
+    __slots__ = ("ttl", "max_size", "_entries")
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: collections.OrderedDict[Hashable, tuple[float, object]] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+
+class UserResolver:
+    def __init__(self, bot: discord.Client, ttl: float = 300, max_size: int = 10_000, member_ttl: float | None = None):
+        self.bot = bot
+        self.users_cache = TTLCache(ttl, max_size)
+        self.members_cache = TTLCache(ttl if member_ttl is None else member_ttl, max_size)
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def _single_flight(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        """Runs `fetch`, unless a lookup for `key` is already running, in which case its result is shared."""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Make sure nobody waiting is left hanging, without warning about an unretrieved exception if nobody is.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def user(self, user_id: int) -> discord.User | None:
+        """Returns a user, or None if they don't exist."""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        cached = self.users_cache.get(user_id, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+        async def fetch():
+            try:
+                result = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                result = None
+            except discord.HTTPException:
+                return None
+            self.users_cache.set(user_id, result)
+            return result
+
+        return await self._single_flight(("user", user_id), fetch)
+
+    async def users(self, *user_ids: int) -> list[discord.User | None]:
+        """Looks up several users at once, in parallel."""
+        return list(await asyncio.gather(*map(self.user, user_ids)))
+
+    async def is_member(self, guild: discord.Guild, user_id: int) -> bool:
+        """Returns whether a user is in a guild."""
+        if guild.get_member(user_id) is not None:
+            return True
+        cached = self.members_cache.get((guild.id, user_id))
+        if cached is not None:
+            return cached
+
+        async def fetch():
+            try:
+                await guild.fetch_member(user_id)
+            except discord.NotFound:
+                result = False
+            except discord.HTTPException:
+                # Unknown, rather than known not to be, so don't remember it.
+                return False
+            else:
+                result = True
+            self.members_cache.set((guild.id, user_id), result)
+            return result
+
+        return await self._single_flight(("member", guild.id, user_id), fetch)
+
+    def invalidate_member(self, guild_id: int, user_id: int) -> None:
+        self.members_cache.pop((guild_id, user_id))
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.users_cache.pop(user_id)
@@ -0,0 +1,179 @@
+"""Per-ticket support response metrics: time to first support reply, number of support replies, and the last one.
+
+Metrics are kept in memory for every open ticket and updated from message events (one dict lookup and one set
+disjointness check per message), then written back in batches along with each first response's addition to the
+daily rollups. Configured via `[trident.responses]`:
+
+    [trident.responses]
+    flush_interval = 30  # seconds between writes to the database"""
+
+import asyncio
+import collections
+import datetime
+import logging
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from ..models import Guild, Ticket, TicketDailyStats
+from .rollups import bucket_for, histogram_percentile
+from .snapshots import TicketSnapshot
+
+__all__ = ("TicketResponses", "ResponseTracker")
+
+log = logging.getLogger("trident.responses")
+
+
+class TicketResponses:
+    __slots__ = ("channel_id", "guild_id", "author_id", "opened_at", "first_response_at", "replies", "last_response_at")
+
+    def __init__(
+        self,
+        channel_id: int,
+        guild_id: int,
+        author_id: int,
+        opened_at: datetime.datetime,
+        first_response_at: datetime.datetime | None = None,
+        replies: int = 0,
+        last_response_at: datetime.datetime | None = None,
+    ):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.opened_at = opened_at
+        self.first_response_at = first_response_at
+        self.replies = replies
+        self.last_response_at = last_response_at
+
+    @property
+    def first_response_time(self) -> float | None:
+        """Seconds between the ticket being opened and support first replying."""
+        if self.first_response_at is None:
+            return None
+        return max(0.0, (self.first_response_at - self.opened_at).total_seconds())
+
+    def apply(self, ticket: Ticket) -> None:
+        """Copies these (possibly not yet saved) metrics onto a ticket."""
+        ticket.first_response_at = self.first_response_at
+        ticket.support_replies = self.replies
+        ticket.last_support_response = self.last_response_at
+
+
+class ResponseTracker:
+    def __init__(self, *, flush_interval: float = 30.0):
+        self.flush_interval = flush_interval
+        self.tickets: dict[int, TicketResponses] = {}
+        self._dirty: set[int] = set()
+        # (guild ID, day, seconds) of first responses not yet added to the daily rollups.
+        self._first_responses: list[tuple[int, datetime.date, float]] = []
+        self._task: asyncio.Task | None = None
+
+    def get(self, channel_id: int) -> TicketResponses | None:
+        return self.tickets.get(channel_id)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def close(self) -> None:
+        """Stops the background flushes, then writes out anything not yet saved."""
+        self.stop()
+        await self.flush()
+
+    def track(self, ticket: Ticket | TicketSnapshot, guild_id: int) -> None:
+        self.tickets[ticket.channel] = TicketResponses(
+            ticket.channel,
+            guild_id,
+            ticket.author,
+            ticket.opened_at,
+            ticket.first_response_at,
+            ticket.support_replies,
+            ticket.last_support_response,
+        )
+
+    def untrack(self, channel_id: int) -> TicketResponses | None:
+        """Stops tracking a ticket, returning its latest metrics. Its first response (if any) is still rolled up."""
+        self._dirty.discard(channel_id)
+        return self.tickets.pop(channel_id, None)
+
+    def record_reply(self, state: TicketResponses, when: datetime.datetime) -> None:
+        if state.first_response_at is None:
+            state.first_response_at = when
+            self._first_responses.append((state.guild_id, when.date(), state.first_response_time))
+        state.replies += 1
+        state.last_response_at = when
+        self._dirty.add(state.channel_id)
+
+    def awaiting_response(self, guild_id: int) -> list[TicketResponses]:
+        """Returns the guild's open tickets that support has not yet replied to, oldest first."""
+        waiting = [
+            state for state in self.tickets.values() if state.guild_id == guild_id and state.first_response_at is None
+        ]
+        return sorted(waiting, key=lambda state: state.opened_at)
+
+    async def flush(self) -> int:
+        dirty = [self.tickets[c] for c in self._dirty if c in self.tickets]
+        self._dirty.clear()
+        first_responses, self._first_responses = self._first_responses, []
+        try:
+            if dirty:
+                await connections.get("default").execute_query(
+                    "UPDATE tickets AS t SET first_response_at = v.first_response_at, support_replies = v.replies, "
+                    "last_support_response = v.last_response_at FROM (SELECT unnest($1::bigint[]) AS channel, "
+                    "unnest($2::timestamptz[]) AS first_response_at, unnest($3::int[]) AS replies, "
+                    "unnest($4::timestamptz[]) AS last_response_at) AS v WHERE t.channel = v.channel",
+                    [
+                        [state.channel_id for state in dirty],
+                        [state.first_response_at for state in dirty],
+                        [state.replies for state in dirty],
+                        [state.last_response_at for state in dirty],
+                    ],
+                )
+        except Exception:
+            self._dirty.update(state.channel_id for state in dirty)
+            self._first_responses = first_responses + self._first_responses
+            raise
+        pending: dict[tuple[int, datetime.date], collections.Counter[str]] = collections.defaultdict(
+            collections.Counter
+        )
+        for guild_id, day, seconds in first_responses:
+            pending[guild_id, day][str(bucket_for(seconds))] += 1
+        try:
+            await self._roll_up(pending)
+        except Exception:
+            # Only the groups whose transactions did not commit are left in `pending`.
+            self._first_responses = [entry for entry in first_responses if entry[:2] in pending] + self._first_responses
+            raise
+        return len(dirty)
+
+    @staticmethod
+    async def _roll_up(pending: dict[tuple[int, datetime.date], collections.Counter[str]]) -> None:
+        """Adds first responses to the daily rollups, one transaction per (guild ID, day). Each group is removed from
+        `pending` once its transaction commits."""
+        for (guild_id, day), buckets in list(pending.items()):
+            async with in_transaction("default") as tx:
+                guild = await Guild.get_or_none(id=guild_id).using_db(tx)
+                if guild is not None:
+                    row, _ = await TicketDailyStats.get_or_create(guild=guild, day=day, using_db=tx)
+                    row = await TicketDailyStats.select_for_update().using_db(tx).get(pk=row.pk)
+                    histogram = dict(row.first_response_histogram)
+                    for bucket, count in buckets.items():
+                        histogram[bucket] = histogram.get(bucket, 0) + count
+                    row.first_response_histogram = histogram
+                    row.responded += sum(buckets.values())
+                    row.median_first_response = histogram_percentile(histogram, 50)
+                    await row.save(using_db=tx)
+            del pending[guild_id, day]
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to save ticket response metrics: %s", e, exc_info=e)
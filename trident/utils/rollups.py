@@ -0,0 +1,120 @@
+"""Incrementally maintained per-guild, per-day ticket statistics.
+
+Time to close (and time to first response, see trident.utils.responses) is kept as a histogram of logarithmically
+sized buckets rather than as raw durations, so that each day's row stays a fixed size however many tickets it covers,
+and percentiles over any range of days can be computed by adding up those days' histograms: O(days * buckets), never
+O(tickets)."""
+
+import datetime
+import math
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from ..models import ClosedTicket, Guild, Ticket, TicketDailyStats
+
+__all__ = (
+    "bucket_for",
+    "bucket_value",
+    "merge_histograms",
+    "histogram_percentile",
+    "record_opened",
+    "record_closed",
+    "summarise",
+)
+
+# Each bucket spans durations 25% longer than the last, so estimates are within ~12% of the real value.
+BUCKET_BASE = 1.25
+
+
+def bucket_for(seconds: float) -> int:
+    return max(0, int(math.log(max(seconds, 1.0), BUCKET_BASE)))
+
+
+def bucket_value(bucket: int) -> float:
+    """The (geometric) midpoint of a bucket, in seconds."""
+    return BUCKET_BASE ** (bucket + 0.5)
+
+
+def merge_histograms(histograms) -> dict[int, int]:
+    merged = {}
+    for histogram in histograms:
+        for bucket, count in histogram.items():
+            merged[int(bucket)] = merged.get(int(bucket), 0) + count
+    return merged
+
+
+def histogram_percentile(histogram: dict, percentile: float) -> float | None:
+    """Estimates the given percentile (0-100) of the durations counted in a histogram."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = total * percentile / 100
+    seen = 0
+    for bucket in sorted(histogram, key=int):
+        seen += histogram[bucket]
+        if seen >= target:
+            return bucket_value(int(bucket))
+
+
+async def _get_row(guild: Guild, day: datetime.date, tx) -> TicketDailyStats:
+    row, _ = await TicketDailyStats.get_or_create(guild=guild, day=day, using_db=tx)
+    return row
+
+
+async def record_opened(guild: Guild, when: datetime.datetime) -> None:
+    async with in_transaction("default") as tx:
+        row = await _get_row(guild, when.date(), tx)
+        await TicketDailyStats.filter(pk=row.pk).using_db(tx).update(opened=F("opened") + 1)
+
+
+async def record_closed(ticket: Ticket, closer_id: int, reason: str | None, when: datetime.datetime) -> ClosedTicket:
+    """Moves a ticket into the closed ticket history, and adds it to the day's rollup."""
+    duration = max(0.0, (when - ticket.opened_at).total_seconds())
+    async with in_transaction("default") as tx:
+        closed = await ClosedTicket.create(
+            guild_id=ticket.guild_id,
+            number=ticket.number,
+            author=ticket.author,
+            channel=ticket.channel,
+            subject=ticket.subject,
+            opened_at=ticket.opened_at,
+            closed_at=when,
+            closed_by=closer_id,
+            reason=reason,
+            duration=duration,
+            first_response_time=(
+                max(0.0, (ticket.first_response_at - ticket.opened_at).total_seconds())
+                if ticket.first_response_at
+                else None
+            ),
+            support_replies=ticket.support_replies,
+            using_db=tx,
+        )
+        row = await _get_row(ticket.guild, when.date(), tx)
+        row = await TicketDailyStats.select_for_update().using_db(tx).get(pk=row.pk)
+        bucket = str(bucket_for(duration))
+        row.close_time_histogram = {**row.close_time_histogram, bucket: row.close_time_histogram.get(bucket, 0) + 1}
+        row.closed += 1
+        row.median_close_time = histogram_percentile(row.close_time_histogram, 50)
+        row.p95_close_time = histogram_percentile(row.close_time_histogram, 95)
+        await row.save(using_db=tx)
+        await ticket.delete(using_db=tx)
+    return closed
+
+
+async def summarise(guild_id: int, days: int) -> tuple[list[TicketDailyStats], dict]:
+    """Returns the daily rows for the last `days` days, and a summary across all of them."""
+    since = datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=days - 1)
+    rows = await TicketDailyStats.filter(guild__id=guild_id, day__gte=since).order_by("day").all()
+    histogram = merge_histograms(row.close_time_histogram for row in rows)
+    first_responses = merge_histograms(row.first_response_histogram for row in rows)
+    return rows, {
+        "opened": sum(row.opened for row in rows),
+        "closed": sum(row.closed for row in rows),
+        "median_close_time": histogram_percentile(histogram, 50),
+        "p95_close_time": histogram_percentile(histogram, 95),
+        "responded": sum(row.responded for row in rows),
+        "median_first_response": histogram_percentile(first_responses, 50),
+        "p95_first_response": histogram_percentile(first_responses, 95),
+    }
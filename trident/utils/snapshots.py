@@ -0,0 +1,192 @@
+"""Frozen, `__slots__`-only copies of database rows, for anything that holds on to rows rather than just using them.
+
+A Tortoise model instance carries a dozen or so attributes of ORM bookkeeping on top of its fields, plus a
+`__dict__`; a snapshot is only its fields. They are read-only (and so hashable, and safe to share between tasks),
+and can be built without instantiating a model at all, from `.values()` rows:
+
+    tags = await TagSnapshot.fetch(Tag.filter(guild__id=guild_id))
+
+Foreign keys are kept as the raw `<name>_id` column, as on the models. Note that `guild_id` is therefore the guild's
+`entry_id`, not its Discord ID. JSON lists are kept as tuples."""
+
+import datetime
+import uuid
+from typing import ClassVar, Self
+
+from tortoise import Model
+from tortoise.queryset import QuerySet
+
+from ..models import Guild, Tag, Ticket, TicketQuestion
+
+__all__ = ("Snapshot", "GuildSnapshot", "QuestionSnapshot", "TicketSnapshot", "TagSnapshot")
+
+
+class Snapshot:
+    __slots__ = ()
+    model: ClassVar[type[Model]]
+    # JSON list fields, stored as tuples.
+    sequences: ClassVar[tuple[str, ...]] = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            value = values[name]
+            if name in self.sequences and value is not None:
+                value = tuple(value)
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_model(cls, instance: Model) -> Self:
+        return cls(**{name: getattr(instance, name) for name in cls.__slots__})
+
+    @classmethod
+    async def fetch(cls, queryset: QuerySet) -> list[Self]:
+        """Runs a query for just this snapshot's fields, skipping model instantiation entirely."""
+        return [cls(**row) for row in await queryset.values(*cls.__slots__)]
+
+    def to_model(self) -> Model:
+        """Returns a model instance for the row this is a snapshot of. Saving it updates that row."""
+        instance = self.model(
+            **{
+                name: list(value) if name in self.sequences and value is not None else value
+                for name, value in self.items()
+            }
+        )
+        instance._saved_in_db = True
+        return instance
+
+    def items(self):
+        return ((name, getattr(self, name)) for name in self.__slots__)
+
+    def replace(self, **changes) -> Self:
+        """Returns a copy of this snapshot with some fields changed."""
+        return type(self)(**{**dict(self.items()), **changes})
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("{} is read-only".format(type(self).__name__))
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("{} is read-only".format(type(self).__name__))
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash((type(self), *(getattr(self, name) for name in self.__slots__)))
+
+    def __repr__(self) -> str:
+        return "{}({})".format(type(self).__name__, ", ".join("{}={!r}".format(*item) for item in self.items()))
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+class GuildSnapshot(Snapshot):
+    __slots__ = (
+        "entry_id",
+        "id",
+        "ticket_count",
+        "ticket_category",
+        "overflow_categories",
+        "auto_create_categories",
+        "log_channel",
+        "support_roles",
+        "ping_support_roles",
+        "max_tickets",
+        "support_enabled",
+        "ticket_rate_limit",
+        "ticket_burst",
+        "auto_close_after",
+    )
+    model = Guild
+    sequences = ("overflow_categories", "support_roles")
+
+    entry_id: uuid.UUID
+    id: int
+    ticket_count: int
+    ticket_category: int | None
+    overflow_categories: tuple[int, ...]
+    auto_create_categories: bool
+    log_channel: int | None
+    support_roles: tuple[int, ...]
+    ping_support_roles: bool
+    max_tickets: int
+    support_enabled: bool
+    ticket_rate_limit: float | None
+    ticket_burst: int | None
+    auto_close_after: int | None
+
+
+class QuestionSnapshot(Snapshot):
+    __slots__ = (
+        "entry_id",
+        "guild_id",
+        "label",
+        "placeholder",
+        "min_length",
+        "max_length",
+        "required",
+        "default_value",
+    )
+    model = TicketQuestion
+
+    entry_id: uuid.UUID
+    guild_id: uuid.UUID
+    label: str
+    placeholder: str
+    min_length: int
+    max_length: int
+    required: bool
+    default_value: str | None
+
+
+class TicketSnapshot(Snapshot):
+    __slots__ = (
+        "entry_id",
+        "number",
+        "guild_id",
+        "author",
+        "channel",
+        "subject",
+        "opened_at",
+        "locked",
+        "last_activity",
+        "inactivity_warned",
+        "first_response_at",
+        "support_replies",
+        "last_support_response",
+    )
+    model = Ticket
+
+    entry_id: uuid.UUID
+    number: int
+    guild_id: uuid.UUID
+    author: int
+    channel: int
+    subject: str | None
+    opened_at: datetime.datetime
+    locked: bool
+    last_activity: datetime.datetime | None
+    inactivity_warned: bool
+    first_response_at: datetime.datetime | None
+    support_replies: int
+    last_support_response: datetime.datetime | None
+
+
+class TagSnapshot(Snapshot):
+    __slots__ = ("entry_id", "guild_id", "created_at", "name", "content", "author", "owner", "uses")
+    model = Tag
+
+    entry_id: uuid.UUID
+    guild_id: uuid.UUID
+    created_at: datetime.datetime
+    name: str
+    content: str
+    author: int
+    owner: int
+    uses: int
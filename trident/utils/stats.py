@@ -0,0 +1,133 @@
+import asyncio
+import collections
+import logging
+import time
+from typing import Iterable
+
+import discord
+
+from ..models import Guild
+from .replicas import read_replica
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+__all__ = ("StatsSnapshot", "StatsSampler")
+
+
+class StatsSnapshot:
+    """A single sample of the bot's resource usage and cache sizes."""
+
+    __slots__ = (
+        "taken_at",
+        "cpu_percent",
+        "rss",
+        "loop_lag",
+        "guilds",
+        "guilds_set_up",
+        "users",
+        "channels",
+        "disk_used",
+        "disk_total",
+    )
+
+    def __init__(self, **kwargs):
+        for key in self.__slots__:
+            setattr(self, key, kwargs.get(key))
+
+
+class StatsSampler:
+    """Samples system and cache stats in the background into a fixed-size ring buffer.
+
+    Channel counts are maintained incrementally from gateway events (see GeneralCog's listeners) rather than by
+    walking every channel, so taking a sample is O(1) apart from the psutil calls, which run in an executor."""
+
+    def __init__(self, bot, *, interval: float = 15.0, size: int = 240):
+        self.bot = bot
+        self.interval = interval
+        self.samples: collections.deque[StatsSnapshot] = collections.deque(maxlen=size)
+        self.channel_counts: collections.Counter[discord.ChannelType] = collections.Counter()
+        self.log = logging.getLogger("trident.stats")
+        self.process = psutil.Process() if psutil else None
+        if self.process is not None:
+            # The first cpu_percent() call without an interval always returns 0, so prime it now.
+            self.process.cpu_percent(None)
+        self._task: asyncio.Task | None = None
+        self._last_lag = 0.0
+
+    @property
+    def latest(self) -> StatsSnapshot | None:
+        return self.samples[-1] if self.samples else None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # Incremental channel counting
+
+    def recount_channels(self) -> None:
+        self.channel_counts = collections.Counter(channel.type for channel in self.bot.get_all_channels())
+
+    def add_channels(self, channels: Iterable[discord.abc.GuildChannel]) -> None:
+        self.channel_counts.update(channel.type for channel in channels)
+
+    def remove_channels(self, channels: Iterable[discord.abc.GuildChannel]) -> None:
+        self.channel_counts.subtract(channel.type for channel in channels)
+
+    # Sampling
+
+    def _system_stats(self) -> dict:
+        if self.process is None:
+            return {}
+        with self.process.oneshot():
+            stats = {"cpu_percent": self.process.cpu_percent(None), "rss": self.process.memory_info().rss}
+        disk = psutil.disk_usage(__file__)
+        stats["disk_used"] = disk.used
+        stats["disk_total"] = disk.total
+        return stats
+
+    async def sample(self) -> StatsSnapshot:
+        system = await asyncio.get_running_loop().run_in_executor(None, self._system_stats)
+        try:
+            with read_replica():
+                guilds_set_up = await Guild.filter().count()
+        except Exception as e:
+            self.log.warning("Failed to count configured guilds: %s", e)
+            guilds_set_up = self.latest.guilds_set_up if self.latest else None
+        snapshot = StatsSnapshot(
+            taken_at=discord.utils.utcnow(),
+            loop_lag=self._last_lag,
+            guilds=len(self.bot.guilds),
+            guilds_set_up=guilds_set_up,
+            users=len(self.bot.users),
+            channels=dict(self.channel_counts),
+            **system,
+        )
+        self.samples.append(snapshot)
+        return snapshot
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                self.log.error("Failed to take stats sample: %s", e, exc_info=e)
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            # How late we woke up is how long something else was hogging the event loop.
+            self._last_lag = max(0.0, time.perf_counter() - expected)
+
+    def trend(self, attribute: str, count: int | None = None) -> tuple[float, float, float, float] | None:
+        """Returns (oldest, newest, minimum, maximum) of an attribute over the last `count` samples."""
+        values = [getattr(x, attribute) for x in list(self.samples)[-(count or len(self.samples)) :]]
+        values = [x for x in values if x is not None]
+        if not values:
+            return None
+        return values[0], values[-1], min(values), max(values)
@@ -0,0 +1,74 @@
+from typing import Iterable
+
+import discord
+
+from ..models import Guild
+from .snapshots import GuildSnapshot
+
+__all__ = ("SupportTemplate", "SupportRoleCache", "member_role_ids")
+
+
+def member_role_ids(member: discord.Member | discord.User) -> Iterable[int]:
+    """Returns a member's role IDs. Uses the member's raw snowflake list where it has one, which avoids resolving (and
+    sorting) every Role object; a User (e.g. someone who has since left) has none."""
+    role_ids = getattr(member, "_roles", None)
+    if role_ids is None:
+        return [role.id for role in getattr(member, "roles", ())]
+    return role_ids
+
+
+class SupportTemplate:
+    """Everything ticket creation and support checks need to know about a guild's support roles, precomputed."""
+
+    __slots__ = ("source", "role_ids", "roles", "overwrites")
+
+    def __init__(
+        self,
+        guild: discord.Guild,
+        support_roles: Iterable[int],
+        allow: discord.PermissionOverwrite,
+        deny: discord.PermissionOverwrite,
+    ):
+        self.source = tuple(support_roles)
+        self.role_ids = frozenset(self.source)
+        self.roles: tuple[discord.Role, ...] = tuple(filter(None, map(guild.get_role, self.source)))
+        self.overwrites: dict[discord.Role | discord.Member, discord.PermissionOverwrite] = {
+            guild.default_role: deny,
+            guild.me: allow,
+            **{role: allow for role in self.roles},
+        }
+
+
+class SupportRoleCache:
+    """Per-guild cache of SupportTemplates and support role IDs.
+
+    Templates are rebuilt whenever the support role list they were built from no longer matches the config they are
+    looked up with. Role IDs are kept as they are until invalidated, so anything that changes a guild's support roles
+    must call `invalidate` - as must anything that deletes or updates a guild's roles, for the templates."""
+
+    def __init__(self, allow: discord.PermissionOverwrite, deny: discord.PermissionOverwrite):
+        self.allow = allow
+        self.deny = deny
+        self._templates: dict[int, SupportTemplate] = {}
+        self._role_ids: dict[int, frozenset[int]] = {}
+
+    def get(self, guild: discord.Guild, config: Guild | GuildSnapshot) -> SupportTemplate:
+        template = self._templates.get(guild.id)
+        if template is None or template.source != tuple(config.support_roles):
+            template = self._templates[guild.id] = SupportTemplate(guild, config.support_roles, self.allow, self.deny)
+        return template
+
+    def role_ids(self, config: Guild | GuildSnapshot) -> frozenset[int]:
+        """Returns the support role IDs for a guild config, without needing the discord.Guild to be cached."""
+        role_ids = self._role_ids.get(config.id)
+        if role_ids is None:
+            role_ids = self._role_ids[config.id] = frozenset(config.support_roles)
+        return role_ids
+
+    def cached_role_ids(self, guild_id: int) -> frozenset[int] | None:
+        """Returns the support role IDs last computed for a guild, if they are still cached."""
+        return self._role_ids.get(guild_id)
+
+    def invalidate(self, guild_id: int) -> None:
+        self._templates.pop(guild_id, None)
+        self._role_ids.pop(guild_id, None)
@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Iterable
+
+__all__ = ("trigrams", "TrigramIndex")
+
+
+def trigrams(value: str) -> frozenset[str]:
+    """Returns the set of trigrams for a string, padded the same way pg_trgm pads words."""
+    value = "  " + value.lower().strip() + " "
+    return frozenset(value[i : i + 3] for i in range(len(value) - 2))
+
+
+class TrigramIndex:
+    """An in-memory inverted index of trigram -> names, used for "did you mean" suggestions.
+
+    Lookups only touch the posting lists of the query's own trigrams, so a miss costs roughly
+    O(len(query) * average posting size) rather than a scan of every name."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: dict[str, frozenset[str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def add(self, name: str) -> None:
+        if name in self._names:
+            return
+        grams = trigrams(name)
+        self._names[name] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        grams = self._names.pop(name, None)
+        if grams is None:
+            return
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(name)
+                if not posting:
+                    del self._postings[gram]
+
+    def rename(self, old: str, new: str) -> None:
+        self.remove(old)
+        self.add(new)
+
+    def search(self, query: str, limit: int = 3, threshold: float = 0.3) -> list[str]:
+        """Returns up to `limit` names whose trigram similarity to `query` is at least `threshold`.
+
+        Similarity is the same Jaccard measure pg_trgm's `similarity()` uses."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for name, common in shared.items():
+            score = common / (len(query_grams) + len(self._names[name]) - common)
+            if score >= threshold:
+                scored.append((score, name))
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [name for _, name in scored[:limit]]
@@ -3,6 +3,7 @@ import json
 import os
 import re
 import textwrap
+import zlib
 from typing import Callable, List, Optional, TypeVar
 
 import discord
@@ -12,6 +13,7 @@ from discord.ui import View as BaseView
 from discord.ui import button, channel_select, role_select
 
 from ..models import TicketQuestion, Guild
+from .snapshots import GuildSnapshot, QuestionSnapshot
 
 T = TypeVar("T")
 
@@ -56,39 +58,110 @@ class ModalSelect(discord.ui.Select):
         self._selected_values = data.get("values", [])
 
 
+class QuestionForm:
+    """A guild's ticket questions, along with the prebuilt keyword arguments for each of their InputTexts."""
+
+    __slots__ = ("questions", "items", "version")
+
+    def __init__(self, questions: list[TicketQuestion | QuestionSnapshot]):
+        self.questions: tuple[TicketQuestion | QuestionSnapshot, ...] = tuple(questions)
+        self.items: tuple[dict, ...] = tuple(
+            dict(
+                style=discord.InputTextStyle.long if q.max_length > 50 else discord.InputTextStyle.short,
+                custom_id=str(q.entry_id),
+                label=q.label,
+                placeholder=q.placeholder,
+                min_length=q.min_length,
+                max_length=q.max_length,
+                required=q.required,
+            )
+            for q in self.questions
+        )
+        # Identifies this exact set of questions, so a form submitted after they were changed can be recognised.
+        self.version = "{:08x}".format(zlib.crc32(repr(self.items).encode()))
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+class QuestionFormCache:
+    """Per-guild cache of QuestionForms, so opening a ticket does not need to query the questions table.
+
+    Anything that creates, edits or deletes a guild's questions must call `invalidate`."""
+
+    def __init__(self):
+        self._forms: dict[int, QuestionForm] = {}
+
+    async def get(self, config: Guild | GuildSnapshot) -> QuestionForm:
+        form = self._forms.get(config.id)
+        if form is None:
+            questions = TicketQuestion.filter(guild_id=config.entry_id).limit(5)
+            form = self._forms[config.id] = QuestionForm(await QuestionSnapshot.fetch(questions))
+        return form
+
+    def invalidate(self, guild_id: int) -> None:
+        self._forms.pop(guild_id, None)
+
+
+question_forms = QuestionFormCache()
+
+
 class QuestionsModal(Modal):
-    def __init__(self, questions: list[TicketQuestion]):
+    def __init__(self, questions: list[TicketQuestion | QuestionSnapshot] | QuestionForm):
         super().__init__(title="Just a few questions first...")
+        if not isinstance(questions, QuestionForm):
+            questions = QuestionForm(questions)
         self._qr = {}
         self._qs = {}
-        for q in questions:
-            item = self.add_item(
-                InputText(
-                    style=discord.InputTextStyle.long if q.max_length > 50 else discord.InputTextStyle.short,
-                    custom_id=str(q.entry_id),
-                    label=q.label,
-                    placeholder=q.placeholder,
-                    min_length=q.min_length,
-                    max_length=q.max_length,
-                    required=q.required,
-                )
-            )
-            self._qr[str(q.entry_id)] = item
-            self._qs[str(q.entry_id)] = q
-        self.answers: dict[TicketQuestion, str] = {}
-
-    def __getitem__(self, item: str | TicketQuestion) -> InputText:
-        if isinstance(item, TicketQuestion):
+        for q, kwargs in zip(questions.questions, questions.items):
+            item = InputText(**kwargs)
+            self.add_item(item)
+            self._qr[kwargs["custom_id"]] = item
+            self._qs[kwargs["custom_id"]] = q
+        self.answers: dict[TicketQuestion | QuestionSnapshot, str] = {}
+
+    def __getitem__(self, item: str | TicketQuestion | QuestionSnapshot) -> InputText:
+        if isinstance(item, (TicketQuestion, QuestionSnapshot)):
             return self._qr[str(item.entry_id)]
         return self._qr[item]
 
     async def callback(self, interaction: discord.Interaction):
-        for key, value in self._qr:
+        for key, value in self._qr.items():
             self.answers[self._qs[key]] = value.value
         await interaction.response.defer()
         self.stop()
 
 
+class TicketQuestionsModal(Modal):
+    """The questions asked before opening a ticket. Submissions are handled by TicketCog's `on_interaction` listener,
+    by this modal's custom_id, rather than by this object.
+
+    py-cord still keeps every modal it sends in its ModalStore until it is submitted, so abandoned forms are dropped
+    from it after `timeout` seconds. A form submitted after that is still handled by the listener as normal."""
+
+    def __init__(self, form: QuestionForm, custom_id: str, user_id: int, *, timeout: float = 600):
+        super().__init__(
+            *(InputText(**kwargs) for kwargs in form.items),
+            title="Just a few questions first...",
+            custom_id=custom_id,
+            timeout=timeout,
+        )
+        self.user_id = user_id
+
+    async def callback(self, interaction: discord.Interaction):
+        pass
+
+    async def on_timeout(self) -> None:
+        # A timed out modal is only stopped, not removed from the store. The store's own removal callback is private,
+        # so if a py-cord upgrade moves it, this just goes back to leaving the modal until it is overwritten.
+        remove = getattr(self, "_Modal__cancel_callback", None)
+        if remove is not None:
+            try:
+                remove(self, self.user_id)
+            except KeyError:
+                pass
+
+
 class ChannelSelectorCustomView(CustomView):
     def __init__(
         self,
@@ -231,6 +304,10 @@ class ServerConfigCustomView(CustomView):
         old = self.config.support_enabled
         self.config.support_enabled = not old
         await self.config.save()
+        ticket_cog = self.ctx.bot.get_cog("TicketCog")
+        if ticket_cog is not None:
+            # Cancels the waitlist, if ticket creation was disabled.
+            await ticket_cog.advance_waitlist(self.ctx.guild)
         self.modify_button(2)
         # noinspection PyTypeChecker
         await interaction.edit_original_response(view=self)
@@ -277,7 +354,7 @@ class TicketQuestionManagerCustomView(CustomView):
 
     @button(label="Create question", emoji="\N{HEAVY PLUS SIGN}", style=discord.ButtonStyle.green)
     async def create_new_question(self, btn: discord.ui.Button, interaction: discord.Interaction):
-        count = await self.config.questions.all().count()
+        count = len(await question_forms.get(self.config))
         if count >= 5:
             btn.disabled = True
             await interaction.edit_original_message(view=self)
@@ -288,20 +365,21 @@ class TicketQuestionManagerCustomView(CustomView):
         modal = CreateNewQuestionModal()
         question = await modal.run(interaction)
         await TicketQuestion.create(guild=self.config, **question)
+        question_forms.invalidate(self.config.id)
         await interaction.edit_original_message(
             content=f"\N{WHITE HEAVY CHECK MARK} {os.urandom(3).hex()} | Added new question!"
         )
 
     @button(label="Preview questions", emoji="\U0001f50d")
     async def preview_questions(self, _, interaction: discord.Interaction):
-        count = await self.config.questions.all().count()
+        count = len(await question_forms.get(self.config))
         if count == 0:
             self.disable_all_items(exclusions=[discord.utils.get(self.children, emoji="\N{HEAVY PLUS SIGN}")])
             await interaction.edit_original_message(view=self)
             return await interaction.response.send_message(
                 "\N{CROSS MARK} You do not have any questions set. Please create one."
             )
-        modal = QuestionsModal(await self.config.questions.all())
+        modal = QuestionsModal(await question_forms.get(self.config))
         await interaction.response.send_modal(modal)
         try:
             await asyncio.wait_for(modal.wait(), timeout=600)
@@ -326,7 +404,7 @@ class TicketQuestionManagerCustomView(CustomView):
     @button(label="Edit question", emoji="\N{PENCIL}", disabled=True)
     async def edit_existing_question(self, _, interaction: discord.Interaction):
         await interaction.response.defer()
-        count = await self.config.questions.all().count()
+        count = len(await question_forms.get(self.config))
         if count == 0:
             self.disable_all_items(exclusions=[discord.utils.get(self.children, emoji="\N{HEAVY PLUS SIGN}")])
             await interaction.edit_original_message(view=self)
@@ -341,7 +419,7 @@ class TicketQuestionManagerCustomView(CustomView):
     @button(label="Remove question", emoji="\N{HEAVY MINUS SIGN}", style=discord.ButtonStyle.red, disabled=True)
     async def remove_existing_question(self, _, interaction: discord.Interaction):
         await interaction.response.defer()
-        count = await self.config.questions.all().count()
+        count = len(await question_forms.get(self.config))
         if count == 0:
             self.disable_all_items(exclusions=[discord.utils.get(self.children, emoji="\N{HEAVY PLUS SIGN}")])
             await interaction.edit_original_message(view=self)
@@ -351,7 +429,7 @@ class TicketQuestionManagerCustomView(CustomView):
         view = RemoveQuestionCustomView(self.ctx, self.config)
         _m = await interaction.followup.send(view=view)
         await view.wait()
-        count = await self.config.questions.all().count()
+        count = len(await question_forms.get(self.config))
         if count > 0:
             self.enable_all_items()
             await interaction.edit_original_message(view=self)
@@ -467,6 +545,7 @@ class EditQuestionCustomView(CustomView):
             modal = CreateNewQuestionModal(data=self.config.questions[index])
             new_data = await modal.run(interaction)
             await TicketQuestion.create(**new_data)
+            question_forms.invalidate(self.config.id)
             await self.config.fetch_related("questions")
             await interaction.followup.send(f"Edited question.")
             await interaction.delete_original_message(delay=0.1)
@@ -511,6 +590,7 @@ class RemoveQuestionCustomView(CustomView):
             index = select.values[0]
             t = await TicketQuestion.get(entry_id=index)
             await t.delete()
+            question_forms.invalidate(self.config.id)
             await self.config.fetch_related("questions")
             await interaction.followup.send(f"Deleted question.")
             await interaction.delete_original_message(delay=0.01)
@@ -0,0 +1,94 @@
+"""Per-guild FIFO queues of people waiting for a ticket while the ticket category is full.
+
+Queues are held in memory, so that checking whether anyone is waiting (on every channel deletion) costs nothing, and
+are mirrored to the ticket_waitlist table so that nobody loses their place across restarts."""
+
+import asyncio
+import logging
+import time
+
+import discord
+
+from ..models import WaitlistEntry
+
+__all__ = ("TicketWaitlist",)
+
+log = logging.getLogger("trident.waitlist")
+
+# Interaction tokens last 15 minutes; leave some headroom.
+FOLLOWUP_LIFETIME = 14 * 60
+
+
+class TicketWaitlist:
+    def __init__(self):
+        # guild ID -> {user ID: entry}, in the order they joined the queue.
+        self._queues: dict[int, dict[int, WaitlistEntry]] = {}
+        # (guild ID, user ID) -> the interaction they queued with, and when.
+        self._interactions: dict[tuple[int, int], tuple[discord.Interaction, float]] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    async def load(self, guild_ids) -> int:
+        """Loads the persisted queues for the given guilds, replacing whatever is in memory."""
+        guild_ids = list(guild_ids)
+        for guild_id in guild_ids:
+            self._queues.pop(guild_id, None)
+        entries = await WaitlistEntry.filter(guild__id__in=guild_ids).order_by("queued_at").prefetch_related("guild")
+        for entry in entries:
+            self._queues.setdefault(entry.guild.id, {})[entry.user] = entry
+        return len(entries)
+
+    def lock(self, guild_id: int) -> asyncio.Lock:
+        """A lock to hold while taking people off a guild's queue, so two deletions can't serve the same person."""
+        return self._locks.setdefault(guild_id, asyncio.Lock())
+
+    def size(self, guild_id: int) -> int:
+        return len(self._queues.get(guild_id, ()))
+
+    def position(self, guild_id: int, user_id: int) -> int | None:
+        """Returns someone's (1-based) place in the queue, or None if they are not queued."""
+        queue = self._queues.get(guild_id, {})
+        if user_id not in queue:
+            return None
+        for position, queued in enumerate(queue, 1):
+            if queued == user_id:
+                return position
+
+    def peek(self, guild_id: int) -> WaitlistEntry | None:
+        queue = self._queues.get(guild_id)
+        return next(iter(queue.values())) if queue else None
+
+    def interaction(self, guild_id: int, user_id: int) -> discord.Interaction | None:
+        """Returns the interaction someone queued with, if it can still be followed up on."""
+        interaction, queued_at = self._interactions.get((guild_id, user_id), (None, 0))
+        if interaction is not None and time.monotonic() - queued_at < FOLLOWUP_LIFETIME:
+            return interaction
+
+    async def add(
+        self, guild, user_id: int, answers: dict[str, str], interaction: discord.Interaction | None = None
+    ) -> int:
+        """Adds someone to the back of a guild's queue, returning their place in it."""
+        queue = self._queues.setdefault(guild.id, {})
+        if user_id not in queue:
+            entry = await WaitlistEntry.create(guild=guild, user=user_id, answers=answers)
+            queue[user_id] = entry
+        if interaction is not None:
+            self._interactions[guild.id, user_id] = (interaction, time.monotonic())
+        return self.position(guild.id, user_id)
+
+    async def remove(self, guild_id: int, user_id: int) -> bool:
+        self._interactions.pop((guild_id, user_id), None)
+        queue = self._queues.get(guild_id)
+        if not queue or user_id not in queue:
+            return False
+        entry = queue.pop(user_id)
+        if not queue:
+            del self._queues[guild_id]
+        await entry.delete()
+        return True
+
+    def forget(self, guild_id: int) -> None:
+        """Drops a guild's queue from memory (its rows are removed along with the guild's config)."""
+        self._queues.pop(guild_id, None)
+        self._locks.pop(guild_id, None)
+        for key in [key for key in self._interactions if key[0] == guild_id]:
+            del self._interactions[key]